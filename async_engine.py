@@ -0,0 +1,95 @@
+import asyncio
+import threading
+from typing import Awaitable, Callable, List, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+class _AdaptiveGate:
+    """Async in-flight limit that follows an AIMD controller's factor"""
+
+    def __init__(self, max_in_flight: int, controller=None):
+        self.max_in_flight = max_in_flight
+        self.controller = controller
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        if self.controller is None:
+            return self.max_in_flight
+        return max(1, int(self.max_in_flight * self.controller.factor))
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def __aexit__(self, *exc_info):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+
+_shared_loop = None
+_shared_lock = threading.Lock()
+
+
+def shared_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the process-wide event loop, running on a daemon thread, that every engine schedules on
+
+    The loop lives as long as the process, so loop-bound resources such as pooled async API
+    clients are reused across translators and runs.
+    """
+    global _shared_loop
+    with _shared_lock:
+        if _shared_loop is None:
+            _shared_loop = asyncio.new_event_loop()
+            threading.Thread(target=_shared_loop.run_forever, name="translation-engine", daemon=True).start()
+        return _shared_loop
+
+
+class AsyncTranslationEngine:
+    def __init__(self, max_in_flight: int = 16, controller=None):
+        """
+        Run translation coroutines on the shared background event loop
+
+        Args:
+            max_in_flight (int): Maximum number of requests in flight across all files
+            controller (AIMDController): Scales the in-flight limit down while the API throttles us
+        """
+        self.max_in_flight = max(1, max_in_flight)
+        self.loop = shared_event_loop()
+        self.global_limit = _AdaptiveGate(self.max_in_flight, controller)
+
+    def run(self, coro: Awaitable[R]) -> R:
+        """Run a coroutine on the engine loop and block the calling thread until it finishes"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def map(self, func: Callable[[T], Awaitable[R]], items: List[T], concurrency: int,
+                  on_done: Callable[[int, T, R], None] = None) -> List[R]:
+        """
+        Apply an async function to every item with bounded concurrency
+
+        A fixed pool of `concurrency` workers drains the items in order, and at most
+        `max_in_flight` calls run at once across all maps. Results are returned in input order;
+        on_done(index, item, result) is called as each call completes, on the engine loop thread.
+        """
+        results = [None] * len(items)
+        pending = iter(enumerate(items))
+
+        async def worker():
+            # Workers share one iterator, so each item is taken exactly once
+            for index, item in pending:
+                async with self.global_limit:
+                    results[index] = await func(item)
+                if on_done:
+                    on_done(index, item, results[index])
+
+        await asyncio.gather(*(worker() for _ in range(min(max(1, concurrency), len(items)))))
+        return results
+
+    def close(self):
+        """Release the engine; the shared loop keeps running for later engines"""
+        self.loop = None
@@ -0,0 +1,355 @@
+import asyncio
+import contextlib
+import contextvars
+import json
+import random
+import threading
+import time
+from typing import List, Optional
+
+from rate_limiter import estimate_tokens
+from client_pool import shared_client_pool
+from retry_policy import classify_error, THROTTLE, TRANSIENT, FATAL
+
+
+# Token usage of the API request currently being measured, see measure_usage()
+_request_usage = contextvars.ContextVar('request_usage', default=None)
+
+
+@contextlib.contextmanager
+def measure_usage():
+    """Collect the token counts backends report (via report_usage) while the block runs"""
+    usage = {'prompt_tokens': 0, 'response_tokens': 0}
+    token = _request_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _request_usage.reset(token)
+
+
+def report_usage(prompt_tokens: int, response_tokens: int):
+    """Called by backends with the token counts of a reply"""
+    usage = _request_usage.get()
+    if usage is not None:
+        usage['prompt_tokens'] += prompt_tokens or 0
+        usage['response_tokens'] += response_tokens or 0
+
+
+class BackendError(Exception):
+    """Base class for translation backend errors; kind tells the retry policy how to react"""
+    kind = FATAL
+
+
+class ThrottledError(BackendError):
+    """The backend rejected the call because a quota was exceeded (retryable, slows the rate)"""
+    kind = THROTTLE
+
+
+class TransientBackendError(BackendError):
+    """A temporary failure such as a timeout or 5xx response (retryable)"""
+    kind = TRANSIENT
+
+
+class FatalBackendError(BackendError):
+    """A failure that retrying will not fix, such as an invalid key or blocked content"""
+    kind = FATAL
+
+
+class BatchFormatError(BackendError):
+    """A batch reply did not contain exactly one translation per input, in order"""
+    kind = FATAL
+
+
+class TranslationBackend:
+    """
+    Interface every translation backend implements
+
+    translate/translate_batch return translations or raise a BackendError subclass.
+    The async variants default to running the sync calls in a worker thread.
+    """
+    model_name = 'unknown'
+
+    def signature(self) -> str:
+        """Identify the prompt setup; together with model_name it keys the translation memory"""
+        return ''
+
+    def estimate_request_tokens(self, texts: List[str], estimator=None) -> int:
+        """Estimated input tokens of a request translating texts
+
+        estimator is a calibrated TokenEstimator to use instead of the fixed 4 characters per token.
+        """
+        estimate = estimator.estimate if estimator else estimate_tokens
+        return sum(estimate(text) for text in texts)
+
+    def count_tokens(self, text: str) -> int:
+        """Exact token count of text according to the API, used to calibrate local estimates"""
+        raise NotImplementedError
+
+    def translate(self, text: str) -> str:
+        raise NotImplementedError
+
+    def translate_batch(self, texts: List[str]) -> List[str]:
+        return [self.translate(text) for text in texts]
+
+    async def translate_async(self, text: str) -> str:
+        return await asyncio.to_thread(self.translate, text)
+
+    async def translate_batch_async(self, texts: List[str]) -> List[str]:
+        return await asyncio.to_thread(self.translate_batch, texts)
+
+
+class PromptBackend(TranslationBackend):
+    """Backend for LLMs that translate through a text prompt; subclasses implement generate()"""
+
+    DEFAULT_PROMPT = "Translate the following text from English to Arabic. Only provide the translation, no additional text:\n\n{text}"
+    # Sent on its own after a system instruction, or after the instructions in BATCH_PROMPT
+    BATCH_MESSAGE = (
+        "Apply these instructions to every string in the JSON array below. "
+        "Reply with only a JSON array of exactly {count} translated strings, in the same order, "
+        "with no additional text:\n\n{items}"
+    )
+    BATCH_PROMPT = "{instructions}\n\n" + BATCH_MESSAGE
+
+    def __init__(self, prompt_template: str = None, system_instruction: bool = False):
+        """
+        Args:
+            prompt_template (str): Prompt containing a {text} placeholder (Optional)
+            system_instruction (bool): Send the static part of the prompt as a system instruction,
+                so the message of each request only carries the row text. The API still bills the
+                system instruction on every request, so this only saves tokens where it is cached.
+        """
+        self.prompt_template = prompt_template or self.DEFAULT_PROMPT
+        self.use_system_instruction = system_instruction
+
+    def signature(self) -> str:
+        return self.prompt_template
+
+    def system_instruction(self) -> Optional[str]:
+        """The static instructions, or None when every request carries the full prompt
+
+        This is the prompt without its {text} placeholder, so a request never costs more
+        tokens than with the prompt spliced in.
+        """
+        if not self.use_system_instruction:
+            return None
+        return self.prompt_template.replace("{text}", "").strip()
+
+    def build_prompt(self, text: str) -> str:
+        """Build the single-row prompt"""
+        if self.use_system_instruction:
+            return text
+        return self.prompt_template.replace("{text}", text)
+
+    def build_batch_prompt(self, texts: List[str]) -> str:
+        """Build a prompt that asks for a JSON array of translations"""
+        items = json.dumps(texts, ensure_ascii=False, indent=0)
+        if self.use_system_instruction:
+            return self.BATCH_MESSAGE.format(count=len(texts), items=items)
+
+        instructions = self.prompt_template.replace("{text}", "(see the JSON array below)")
+        return self.BATCH_PROMPT.format(instructions=instructions, count=len(texts), items=items)
+
+    def estimate_request_tokens(self, texts: List[str], estimator=None) -> int:
+        estimate = estimator.estimate if estimator else estimate_tokens
+        prompt = self.build_prompt(texts[0]) if len(texts) == 1 else self.build_batch_prompt(texts)
+        # The API still counts system instruction tokens as input on every request
+        system_instruction = self.system_instruction()
+        return estimate(prompt) + (estimate(system_instruction) if system_instruction else 0)
+
+    @staticmethod
+    def parse_batch_reply(reply: str, expected_count: int) -> List[str]:
+        """Parse a JSON array reply, raising BatchFormatError unless it holds exactly expected_count strings"""
+        reply = reply.strip()
+
+        # Models often wrap JSON in a markdown code fence
+        if reply.startswith("```"):
+            reply = reply.split("\n", 1)[1] if "\n" in reply else ""
+            reply = reply.rsplit("```", 1)[0]
+
+        try:
+            items = json.loads(reply)
+        except ValueError:
+            raise BatchFormatError("Batch reply is not valid JSON")
+
+        if not isinstance(items, list) or len(items) != expected_count:
+            raise BatchFormatError(f"Expected a JSON array of {expected_count} items")
+        if not all(isinstance(item, str) for item in items):
+            raise BatchFormatError("Batch reply contains non-string items")
+
+        return [item.strip() for item in items]
+
+    def generate(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    async def generate_async(self, prompt: str) -> str:
+        return await asyncio.to_thread(self.generate, prompt)
+
+    def translate(self, text: str) -> str:
+        return self.generate(self.build_prompt(text)).strip()
+
+    def translate_batch(self, texts: List[str]) -> List[str]:
+        return self.parse_batch_reply(self.generate(self.build_batch_prompt(texts)), len(texts))
+
+    async def translate_async(self, text: str) -> str:
+        return (await self.generate_async(self.build_prompt(text))).strip()
+
+    async def translate_batch_async(self, texts: List[str]) -> List[str]:
+        reply = await self.generate_async(self.build_batch_prompt(texts))
+        return self.parse_batch_reply(reply, len(texts))
+
+
+class GeminiBackend(PromptBackend):
+    def __init__(self, api_key: str, model_name: str = 'gemini-pro', prompt_template: str = None,
+                 system_instruction: bool = False):
+        """
+        Google Gemini backend
+
+        Clients come from a process-wide pool keyed by API key, model and system instruction,
+        so creating another backend (e.g. for every GUI run) reuses the existing connections.
+
+        Args:
+            api_key (str): Your Google Gemini API key
+            model_name (str): Gemini model to use
+            prompt_template (str): Prompt containing a {text} placeholder (Optional)
+            system_instruction (bool): Send the prompt as a system instruction (gemini-1.5 and later models only)
+        """
+        super().__init__(prompt_template, system_instruction)
+        self.model_name = model_name
+
+        instruction = self.system_instruction()
+        self.pool = shared_client_pool(
+            ('gemini', api_key, model_name, instruction),
+            lambda: GeminiBackend._make_model(api_key, model_name, '_client', instruction),
+            lambda: GeminiBackend._make_model(api_key, model_name, '_async_client', instruction)
+        )
+        # Token counts for calibration must not include the system instruction
+        self.count_pool = shared_client_pool(('gemini', api_key, model_name, None),
+                                             lambda: GeminiBackend._make_model(api_key, model_name, '_client'))
+
+    @staticmethod
+    def _make_model(api_key: str, model_name: str, client_attribute: str, system_instruction: str = None):
+        """Create a GenerativeModel with its own API client instead of the SDK's global default one"""
+        # The SDK takes most of a second to import, so it is only loaded when a Gemini client is needed
+        import google.generativeai as genai
+        from google.generativeai.client import _ClientManager
+
+        # A private client manager per model avoids genai.configure(), which would replace the
+        # process-wide default clients (and their connections) on every call
+        manager = _ClientManager()
+        manager.configure(api_key=api_key)
+        client_name = 'generative_async' if client_attribute == '_async_client' else 'generative'
+
+        model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
+        setattr(model, client_attribute, manager.make_client(client_name))
+        return model
+
+    @staticmethod
+    def _wrap(error: Exception) -> BackendError:
+        """Translate SDK exceptions into backend error classes"""
+        kind = classify_error(error)
+        error_class = {THROTTLE: ThrottledError, TRANSIENT: TransientBackendError}.get(kind, FatalBackendError)
+        wrapped = error_class(f"{type(error).__name__}: {error}")
+        wrapped.__cause__ = error
+        return wrapped
+
+    @staticmethod
+    def _reply_text(response) -> str:
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is not None:
+            report_usage(getattr(usage, 'prompt_token_count', 0), getattr(usage, 'candidates_token_count', 0))
+        return response.text
+
+    def count_tokens(self, text: str) -> int:
+        try:
+            with self.count_pool.client() as model:
+                return model.count_tokens(text).total_tokens
+        except Exception as e:
+            raise self._wrap(e)
+
+    def generate(self, prompt: str) -> str:
+        try:
+            with self.pool.client() as model:
+                return self._reply_text(model.generate_content(prompt))
+        except Exception as e:
+            raise self._wrap(e)
+
+    async def generate_async(self, prompt: str) -> str:
+        try:
+            async with self.pool.async_client() as model:
+                return self._reply_text(await model.generate_content_async(prompt))
+        except Exception as e:
+            raise self._wrap(e)
+
+
+class SimulatedBackend(TranslationBackend):
+    model_name = 'simulated'
+
+    def __init__(self, latency: float = 0.2, latency_jitter: float = 0.1, failure_rate: float = 0.0,
+                 throttle_rate: float = 0.0, batch_error_rate: float = 0.0, seed: int = None):
+        """
+        Offline stand-in backend for running and load-testing the pipeline without network or a key
+
+        Translations are deterministic ("[ar] " + source text), so runs can be compared.
+
+        Args:
+            latency (float): Mean seconds per call
+            latency_jitter (float): Uniform +/- jitter added to each call's latency
+            failure_rate (float): Probability that a call fails with a transient error
+            throttle_rate (float): Probability that a call is rejected as throttled (429)
+            batch_error_rate (float): Probability that a batch reply is malformed
+            seed (int): Seed for the random failures and jitter
+        """
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.failure_rate = failure_rate
+        self.throttle_rate = throttle_rate
+        self.batch_error_rate = batch_error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    @staticmethod
+    def fake_translation(text: str) -> str:
+        """The deterministic translation the simulator returns for text"""
+        return f"[ar] {text.strip()}"
+
+    def _next_call(self, batch: bool = False) -> float:
+        """Count the call, raise the simulated failure if one is drawn, and return the latency"""
+        with self.lock:
+            self.calls += 1
+            draw = self.random.random()
+            malformed = batch and self.random.random() < self.batch_error_rate
+            latency = max(0.0, self.latency + self.random.uniform(-self.latency_jitter, self.latency_jitter))
+
+        if draw < self.throttle_rate:
+            raise ThrottledError("Simulated 429: quota exceeded")
+        if draw < self.throttle_rate + self.failure_rate:
+            raise TransientBackendError("Simulated 503: service unavailable")
+        if malformed:
+            raise BatchFormatError("Simulated malformed batch reply")
+        return latency
+
+    def count_tokens(self, text: str) -> int:
+        return estimate_tokens(text)
+
+    def _reply(self, texts: List[str]) -> List[str]:
+        """Build the fake translations and report estimated token usage, as a real API would"""
+        translations = [self.fake_translation(text) for text in texts]
+        report_usage(self.estimate_request_tokens(texts), sum(estimate_tokens(t) for t in translations))
+        return translations
+
+    def translate(self, text: str) -> str:
+        time.sleep(self._next_call())
+        return self._reply([text])[0]
+
+    def translate_batch(self, texts: List[str]) -> List[str]:
+        time.sleep(self._next_call(batch=True))
+        return self._reply(texts)
+
+    async def translate_async(self, text: str) -> str:
+        await asyncio.sleep(self._next_call())
+        return self._reply([text])[0]
+
+    async def translate_batch_async(self, texts: List[str]) -> List[str]:
+        await asyncio.sleep(self._next_call(batch=True))
+        return self._reply(texts)
@@ -0,0 +1,278 @@
+"""
+Throughput benchmark for the translation pipeline, run offline against SimulatedBackend
+
+Generates synthetic catalogs in the 5-column layout the translator expects, runs each
+scenario in a fresh subprocess (so peak RSS is per scenario) and saves the results as JSON
+for comparison across commits:
+
+    python benchmarks/bench_pipeline.py --rows 2000 --duplicate-ratio 0.3 -o bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCENARIOS = {
+    'sequential': {'mode': 'single', 'concurrency': 1, 'batch_size': 1},
+    'concurrent': {'mode': 'single', 'concurrency': 8, 'batch_size': 1},
+    'batched': {'mode': 'single', 'concurrency': 8, 'batch_size': 20},
+    'memory': {'mode': 'single', 'concurrency': 8, 'batch_size': 1, 'cache': True},
+    'folder': {'mode': 'folder', 'concurrency': 1, 'batch_size': 1, 'max_workers': 3, 'small_files': 20},
+    # Same folder with parsing and writing in one worker process per core instead of threads
+    'folder_processes': {'mode': 'folder', 'concurrency': 1, 'batch_size': 1, 'max_workers': 3, 'small_files': 20,
+                         'processes': None},
+}
+
+_ADJECTIVES = ['Wireless', 'Stainless', 'Portable', 'Premium', 'Compact', 'Waterproof', 'Ergonomic', 'Smart',
+               'Rechargeable', 'Lightweight', 'Foldable', 'Adjustable', 'Non-Stick', 'Cotton', 'Leather']
+_PRODUCTS = ['Bluetooth Headphones', 'Water Bottle', 'Phone Case', 'Laptop Stand', 'Frying Pan', 'Backpack',
+             'Desk Lamp', 'Running Shoes', 'Coffee Maker', 'Power Bank', 'Yoga Mat', 'Wrist Watch', 'T-Shirt']
+_DETAILS = ['with fast charging', 'for men and women', '1.5 L capacity', 'black colour', 'with 2 year warranty',
+            'suitable for travel', 'dishwasher safe', 'with noise cancellation', 'pack of 2', 'size XL']
+
+
+def _product_text(rng: random.Random) -> str:
+    words = [rng.choice(_ADJECTIVES), rng.choice(_PRODUCTS)]
+    words += rng.sample(_DETAILS, rng.randint(0, 3))
+    return ' '.join(words) + f' ({rng.randint(1, 99999)})'
+
+
+def generate_catalog(path: str, rows: int, duplicate_ratio: float = 0.0, flagged_ratio: float = 1.0,
+                     seed: int = 0):
+    """Write a synthetic catalog (.xlsx or .csv) with the SKU/name/English/Arabic/flag layout"""
+    import pandas as pd
+
+    rng = random.Random(seed)
+    english = []
+    for _ in range(rows):
+        if english and rng.random() < duplicate_ratio:
+            english.append(rng.choice(english))
+        else:
+            english.append(_product_text(rng))
+
+    df = pd.DataFrame({
+        'SKU': [f'SKU-{seed}-{i:07d}' for i in range(rows)],
+        'Product Name': [text.split(' (')[0] for text in english],
+        'English': english,
+        'Arabic': [None] * rows,
+        'Translate': [1 if rng.random() < flagged_ratio else 0 for _ in range(rows)],
+    })
+    if path.endswith('.csv'):
+        df.to_csv(path, index=False)
+    else:
+        df.to_excel(path, index=False)
+
+
+def _percentile(values: List[float], fraction: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+        except (ImportError, AttributeError):
+            return None
+
+
+def run_scenario(name: str, config: dict) -> dict:
+    """Run one scenario in this process and return its measurements"""
+    from backends import TranslationBackend, SimulatedBackend
+    from translator import ExcelTranslator
+
+    class RecordingBackend(TranslationBackend):
+        """Wraps a backend and records the latency of every call"""
+
+        def __init__(self, inner: TranslationBackend):
+            self.inner = inner
+            self.model_name = inner.model_name
+            self.latencies = []
+            self.lock = threading.Lock()
+
+        def _record(self, started: float):
+            with self.lock:
+                self.latencies.append(time.perf_counter() - started)
+
+        def signature(self) -> str:
+            return self.inner.signature()
+
+        def estimate_request_tokens(self, texts: List[str], estimator=None) -> int:
+            return self.inner.estimate_request_tokens(texts, estimator)
+
+        def translate(self, text: str) -> str:
+            started = time.perf_counter()
+            try:
+                return self.inner.translate(text)
+            finally:
+                self._record(started)
+
+        def translate_batch(self, texts: List[str]) -> List[str]:
+            started = time.perf_counter()
+            try:
+                return self.inner.translate_batch(texts)
+            finally:
+                self._record(started)
+
+        async def translate_async(self, text: str) -> str:
+            started = time.perf_counter()
+            try:
+                return await self.inner.translate_async(text)
+            finally:
+                self._record(started)
+
+        async def translate_batch_async(self, texts: List[str]) -> List[str]:
+            started = time.perf_counter()
+            try:
+                return await self.inner.translate_batch_async(texts)
+            finally:
+                self._record(started)
+
+    workdir = tempfile.mkdtemp(prefix=f'bench_{name}_')
+    ext = '.' + config['format']
+    inputs = os.path.join(workdir, 'input')
+    os.makedirs(inputs)
+
+    generate_catalog(os.path.join(inputs, 'catalog' + ext), config['rows'], config['duplicate_ratio'],
+                     config['flagged_ratio'], config['seed'])
+    for i in range(config.get('small_files', 0)):
+        generate_catalog(os.path.join(inputs, f'small_{i:02d}' + ext), max(1, config['rows'] // 100),
+                         config['duplicate_ratio'], config['flagged_ratio'], config['seed'] + i + 1)
+
+    backend = RecordingBackend(SimulatedBackend(latency=config['latency'], latency_jitter=config['latency'] / 2,
+                                                failure_rate=config['failure_rate'], seed=config['seed']))
+    translator = ExcelTranslator(
+        api_key=None,
+        backend=backend,
+        log_callback=lambda message: None,
+        cache_file=os.path.join(workdir, 'memory.db') if config.get('cache') else None,
+        max_in_flight=max(16, config['concurrency'] * config.get('max_workers', 1)),
+        retry_base_delay=0.01
+    )
+
+    started = time.perf_counter()
+    if config['mode'] == 'folder':
+        results = translator.batch_process_folder(inputs, os.path.join(workdir, 'output'),
+                                                  max_workers=config.get('max_workers', 3), delay=0,
+                                                  batch_size=config['batch_size'],
+                                                  concurrency=config['concurrency'],
+                                                  processes=config.get('processes', 0))
+    else:
+        results = [translator.process_single_file(os.path.join(inputs, 'catalog' + ext),
+                                                  os.path.join(workdir, 'catalog_translated' + ext), delay=0,
+                                                  batch_size=config['batch_size'],
+                                                  concurrency=config['concurrency'])]
+    elapsed = time.perf_counter() - started
+    cache_stats = translator.cache_stats()
+    translator.close()
+
+    translated = sum(result['translations_made'] for result in results)
+    phase_times = {'read': 0.0, 'translate': 0.0, 'write': 0.0}
+    for result in results:
+        for phase, seconds in result.get('phase_times', {}).items():
+            phase_times[phase] += seconds
+
+    return {
+        'scenario': name,
+        'config': config,
+        'files': len(results),
+        'failed_files': sum(1 for result in results if not result['success']),
+        'rows_translated': translated,
+        'elapsed_seconds': elapsed,
+        'rows_per_second': translated / elapsed if elapsed else None,
+        'api_calls': len(backend.latencies),
+        'latency_p50': _percentile(backend.latencies, 0.50),
+        'latency_p95': _percentile(backend.latencies, 0.95),
+        'peak_rss_mb': _peak_rss_mb(),
+        'phase_times': phase_times,
+        'memory_hit_rate': cache_stats['hit_rate'] if cache_stats else None,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the translation pipeline against the simulated backend.")
+    parser.add_argument("--rows", type=int, default=1000, help="Rows in the main catalog. (Default: 1000)")
+    parser.add_argument("--duplicate-ratio", dest="duplicate_ratio", type=float, default=0.3,
+                        help="Fraction of rows repeating an earlier English text. (Default: 0.3)")
+    parser.add_argument("--flagged-ratio", dest="flagged_ratio", type=float, default=1.0,
+                        help="Fraction of rows flagged for translation. (Default: 1.0)")
+    parser.add_argument("--latency", type=float, default=0.02,
+                        help="Mean simulated API latency in seconds. (Default: 0.02)")
+    parser.add_argument("--failure-rate", dest="failure_rate", type=float, default=0.0,
+                        help="Fraction of simulated calls failing with a retryable error. (Default: 0.0)")
+    parser.add_argument("--format", choices=["xlsx", "csv"], default="xlsx", help="Catalog file format. (Default: xlsx)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed. (Default: 0)")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS),
+                        help="Scenarios to run. (Default: all)")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="JSON file to write. (Default: bench_results.json)")
+    parser.add_argument("--run-one", dest="run_one", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        # Child process: run a single scenario and print its result as JSON
+        name, config = json.loads(args.run_one)
+        print(json.dumps(run_scenario(name, config)))
+        return
+
+    base = {key: getattr(args, key) for key in
+            ('rows', 'duplicate_ratio', 'flagged_ratio', 'latency', 'failure_rate', 'format', 'seed')}
+
+    runs = []
+    for name in args.scenarios:
+        config = dict(base, **SCENARIOS[name])
+        print(f"▶ {name} ...", flush=True)
+        child = subprocess.run([sys.executable, os.path.abspath(__file__), '--run-one', json.dumps([name, config])],
+                               capture_output=True, text=True)
+        if child.returncode != 0:
+            print(child.stderr)
+            runs.append({'scenario': name, 'config': config, 'error': child.stderr.strip().splitlines()[-1:]})
+            continue
+
+        run = json.loads(child.stdout.strip().splitlines()[-1])
+        runs.append(run)
+        print(f"  {run['rows_translated']} rows in {run['elapsed_seconds']:.2f}s "
+              f"({run['rows_per_second']:.1f} rows/s), {run['api_calls']} API calls, "
+              f"p50 {run['latency_p50'] or 0:.3f}s, p95 {run['latency_p95'] or 0:.3f}s, "
+              f"peak RSS {run['peak_rss_mb'] or 0:.0f} MB")
+        print("  phases: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in run['phase_times'].items()))
+
+    report = {
+        'commit': _git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'runs': runs,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Input tokens per request with the prompt spliced into every request vs. sent as a system instruction
+
+Builds the real requests for a synthetic catalog (see bench_pipeline.generate_catalog) in both
+modes and counts their tokens, locally by default or with the Gemini token counter:
+
+    python benchmarks/bench_prompt_tokens.py --prompt-file style_guide.txt --rows 1000 --batch-size 1 20
+    python benchmarks/bench_prompt_tokens.py --count-with-api --model gemini-1.5-flash
+
+"Message" tokens are what each request carries besides the system instruction. Gemini still
+bills the system instruction as input on every request, so "billed" adds it back per request;
+that is what the mode costs until the instruction is served from a context cache, which is
+why the translator only uses it with --system-instruction.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from backends import PromptBackend  # noqa: E402
+from rate_limiter import estimate_tokens  # noqa: E402
+from bench_pipeline import _product_text  # noqa: E402
+
+# Stand-in for a long style guide when no prompt file is given
+_STYLE_RULES = [
+    "Use Modern Standard Arabic suitable for an e-commerce product catalog.",
+    "Keep brand names, model numbers and SKUs in Latin script exactly as written.",
+    "Write measurements with Western digits and keep the original units (cm, kg, L, mAh).",
+    "Translate colours with the common retail term, e.g. 'black' as 'أسود'.",
+    "Do not add marketing claims, emojis or text that is not in the source.",
+    "Prefer short noun phrases for titles; keep the source word order when it reads naturally.",
+    "Render 'pack of N' as 'عبوة من N' and 'set of N' as 'طقم من N'.",
+    "Keep size labels such as S, M, L, XL untranslated.",
+]
+
+
+def default_prompt(rules: int = 40) -> str:
+    lines = ["You are translating product data from English to Arabic. Follow this style guide:"]
+    lines += [f"{i + 1}. {_STYLE_RULES[i % len(_STYLE_RULES)]}" for i in range(rules)]
+    lines.append("Only provide the translation, no additional text:\n\n{text}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare request input tokens with and without a system instruction.")
+    parser.add_argument("--prompt-file", dest="prompt_file", help="Custom prompt with a {text} placeholder. (Default: a synthetic style guide)")
+    parser.add_argument("--rows", type=int, default=1000, help="Rows to translate. (Default: 1000)")
+    parser.add_argument("--batch-size", dest="batch_sizes", type=int, nargs="+", default=[1, 20],
+                        help="Rows per request to compare. (Default: 1 20)")
+    parser.add_argument("--count-with-api", dest="count_with_api", action="store_true",
+                        help="Count tokens with the Gemini API (needs GEMINI_API_KEY) instead of the local estimate.")
+    parser.add_argument("--model", default="gemini-1.5-flash", help="Model for --count-with-api. (Default: gemini-1.5-flash)")
+    parser.add_argument("-o", "--output", help="Also save the results as JSON. (Optional)")
+    args = parser.parse_args()
+
+    if args.prompt_file:
+        with open(args.prompt_file, 'r', encoding='utf-8') as f:
+            prompt = f.read().strip()
+    else:
+        prompt = default_prompt()
+
+    count = estimate_tokens
+    if args.count_with_api:
+        from backends import GeminiBackend
+        count = GeminiBackend(os.environ.get("GEMINI_API_KEY"), args.model, prompt).count_tokens
+
+    rng = random.Random(0)
+    texts = [_product_text(rng) for _ in range(args.rows)]
+
+    spliced = PromptBackend(prompt, system_instruction=False)
+    system = PromptBackend(prompt, system_instruction=True)
+    instruction_tokens = count(system.system_instruction())
+
+    runs = []
+    for batch_size in args.batch_sizes:
+        batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+
+        def build(backend, batch):
+            return backend.build_prompt(batch[0]) if len(batch) == 1 else backend.build_batch_prompt(batch)
+
+        spliced_tokens = sum(count(build(spliced, batch)) for batch in batches)
+        message_tokens = sum(count(build(system, batch)) for batch in batches)
+        billed_tokens = message_tokens + instruction_tokens * len(batches)
+
+        run = {
+            'batch_size': batch_size,
+            'requests': len(batches),
+            'spliced_tokens': spliced_tokens,
+            'message_tokens': message_tokens,
+            'system_instruction_tokens': instruction_tokens,
+            'billed_tokens': billed_tokens,
+            'message_tokens_saved': spliced_tokens - message_tokens,
+        }
+        runs.append(run)
+
+        print(f"Batch size {batch_size}: {len(batches)} requests")
+        print(f"  Prompt spliced into every request: {spliced_tokens / len(batches):8.1f} tokens/request, "
+              f"{spliced_tokens} total")
+        print(f"  Row text only (system instruction): {message_tokens / len(batches):8.1f} tokens/request, "
+              f"{message_tokens} total ({1 - message_tokens / spliced_tokens:.0%} smaller)")
+        print(f"  Billed incl. {instruction_tokens}-token system instruction per request: {billed_tokens} total "
+              f"({billed_tokens - spliced_tokens:+d} vs. spliced)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'prompt_tokens': count(prompt), 'counted_with_api': args.count_with_api, 'runs': runs}, f, indent=2)
+        print(f"💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Import-time budget check for the CLI and GUI entry points
+
+Imports each entry module in a fresh interpreter under `python -X importtime`, takes the
+median cumulative import time over several runs, and fails (exit code 1) when a module goes
+over its budget or pulls in a heavy dependency that should only load once a translation starts:
+
+    python benchmarks/import_budget.py
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Entry module -> cumulative import budget in milliseconds
+BUDGETS_MS = {
+    'translate': 250,
+    'main': 350,
+}
+
+# Loaded lazily, when files are read or a Gemini backend is created
+HEAVY_MODULES = ('pandas', 'numpy', 'openpyxl', 'google.generativeai')
+
+# Wall-clock budget for `translate.py --help`, including interpreter startup
+HELP_BUDGET_MS = 500
+
+_LINE_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def measure_import(module: str):
+    """Return (cumulative import time in ms, names of all modules imported) for one cold import"""
+    child = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                           cwd=ROOT, capture_output=True, text=True)
+    if child.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{child.stderr}")
+
+    cumulative = None
+    imported = set()
+    for line in child.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if not match:
+            continue
+        imported.add(match.group(4))
+        if match.group(4) == module and len(match.group(3)) == 1:  # Top level, not a nested import
+            cumulative = int(match.group(2)) / 1000
+    return cumulative, imported
+
+
+def measure_help() -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(ROOT, 'translate.py'), '--help'], cwd=ROOT,
+                   capture_output=True, check=True)
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import-time budget of the entry points.")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per measurement; the median is used. (Default: 5)")
+    args = parser.parse_args()
+
+    failures = []
+    for module, budget in BUDGETS_MS.items():
+        times = []
+        heavy = set()
+        for _ in range(args.runs):
+            cumulative, imported = measure_import(module)
+            times.append(cumulative)
+            heavy.update(name for name in imported if name in HEAVY_MODULES)
+
+        median = statistics.median(times)
+        status = "✅" if median <= budget and not heavy else "❌"
+        print(f"{status} import {module}: {median:.0f} ms (budget {budget} ms)")
+        if median > budget:
+            failures.append(f"import {module} took {median:.0f} ms, over the {budget} ms budget")
+        if heavy:
+            failures.append(f"import {module} loads {', '.join(sorted(heavy))} eagerly")
+
+    help_ms = statistics.median(measure_help() for _ in range(args.runs))
+    status = "✅" if help_ms <= HELP_BUDGET_MS else "❌"
+    print(f"{status} translate.py --help: {help_ms:.0f} ms (budget {HELP_BUDGET_MS} ms)")
+    if help_ms > HELP_BUDGET_MS:
+        failures.append(f"translate.py --help took {help_ms:.0f} ms, over the {HELP_BUDGET_MS} ms budget")
+
+    if failures:
+        print("\n".join(["", "Import budget exceeded:"] + [f"  - {failure}" for failure in failures]))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
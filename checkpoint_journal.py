@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+def source_hash(text: str) -> str:
+    """Short hash of a source cell, used to detect rows whose text changed since the journal was written"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+class CheckpointJournal:
+    def __init__(self, path: str, resume: bool = False, flush_interval: float = 1.0,
+                 fsync_interval: float = 5.0):
+        """
+        Append-only journal of finished row translations
+
+        The journal is only ever appended to, so starting a run never destroys the checkpoint
+        of an interrupted one. Once a file has been saved, complete() marks its rows as done,
+        and they are no longer replayed. The file itself is only created on the first record.
+
+        Args:
+            path (str): Path to the journal file (JSON lines)
+            resume (bool): Replay the rows already in the journal so they are not translated again
+            flush_interval (float): Seconds between flushes of the write buffer
+            fsync_interval (float): Seconds between fsyncs of the journal to disk
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.lock = threading.Lock()
+        self.entries: Dict[Tuple[str, int], Tuple[str, str]] = {}
+
+        self._file = None
+
+        if resume:
+            self._replay()
+
+        self._last_flush = self._last_fsync = time.monotonic()
+
+    @staticmethod
+    def default_path(output_file_path: str) -> str:
+        """Journal path for an output file, so runs writing different outputs never share a journal"""
+        return f"{output_file_path}.journal.jsonl"
+
+    def pending_rows(self) -> int:
+        """Number of rows journaled on disk by unfinished runs (replayed or not)"""
+        if self.entries or not os.path.exists(self.path):
+            return len(self.entries)
+        return len(self._read())
+
+    def _replay(self):
+        self.entries.update(self._read())
+
+    def _read(self) -> Dict[Tuple[str, int], Tuple[str, str]]:
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+
+        # A truncated last line may also end inside a multi-byte character
+        with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    if entry.get('done'):
+                        # The file was saved after these rows; they no longer need restoring
+                        for key in [key for key in entries if key[0] == entry['file']]:
+                            del entries[key]
+                        continue
+                    key = (entry['file'], entry['row'])
+                    entries[key] = (entry['hash'], entry['translation'])
+                except (ValueError, KeyError, AttributeError):
+                    # A crash can leave a truncated last line
+                    continue
+        return entries
+
+    def _write(self, line: str):
+        # Called with the lock held
+        if self._file is None:
+            folder = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(folder, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8', buffering=1024 * 1024)
+        self._file.write(line + '\n')
+
+    def lookup(self, file_path: str, row, text: str) -> Optional[str]:
+        """Return the journaled translation of a row, if its source text is unchanged"""
+        entry = self.entries.get((os.path.abspath(file_path), int(row)))
+        if entry and entry[0] == source_hash(text):
+            return entry[1]
+        return None
+
+    def record(self, file_path: str, row, text: str, translation: str):
+        """Append a finished row; the write is buffered and flushed periodically"""
+        line = json.dumps({
+            'file': os.path.abspath(file_path),
+            'row': int(row),
+            'hash': source_hash(text),
+            'translation': translation
+        }, ensure_ascii=False)
+
+        with self.lock:
+            self._write(line)
+
+            now = time.monotonic()
+            if now - self._last_flush >= self.flush_interval:
+                self._file.flush()
+                self._last_flush = now
+                if now - self._last_fsync >= self.fsync_interval:
+                    os.fsync(self._file.fileno())
+                    self._last_fsync = now
+
+    def complete(self, file_path: str):
+        """Mark every row of a saved file as done, so a later resume does not restore them"""
+        file_path = os.path.abspath(file_path)
+        with self.lock:
+            self._write(json.dumps({'file': file_path, 'done': True}, ensure_ascii=False))
+            for key in [key for key in self.entries if key[0] == file_path]:
+                del self.entries[key]
+        self.flush()
+
+    def flush(self):
+        """Flush the buffer and fsync the journal"""
+        with self.lock:
+            if self._file is None:
+                return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._last_flush = self._last_fsync = time.monotonic()
+
+    def close(self):
+        """Flush and close the journal"""
+        self.flush()
+        with self.lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def discard(self):
+        """Close the journal and delete its file, once every file it covered has been saved"""
+        self.close()
+        with self.lock:
+            self.entries.clear()
+            if os.path.exists(self.path):
+                os.remove(self.path)
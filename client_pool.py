@@ -0,0 +1,79 @@
+import asyncio
+import contextlib
+import threading
+import weakref
+from typing import Callable, Dict, Hashable
+
+
+class ClientPool:
+    def __init__(self, factory: Callable[[], object], async_factory: Callable[[], object] = None):
+        """
+        Pool of API clients that are checked out for one call at a time and then returned
+
+        Each concurrent caller gets its own client, so connections are reused with keep-alive
+        instead of being set up per call, and callers never wait on each other's client. The
+        pool grows to the peak number of concurrent calls and keeps its clients between runs.
+
+        Args:
+            factory: Creates a client for synchronous calls
+            async_factory: Creates a client for async calls; called on the event loop that uses it,
+                since async clients are bound to their loop (Optional)
+        """
+        self.factory = factory
+        self.async_factory = async_factory
+        self.lock = threading.Lock()
+        self._idle = []
+        self._idle_async = weakref.WeakKeyDictionary()  # event loop -> idle async clients
+        self.created = 0
+
+    @contextlib.contextmanager
+    def client(self):
+        """Check out a synchronous client for the duration of the block"""
+        with self.lock:
+            client = self._idle.pop() if self._idle else None
+        if client is None:
+            client = self.factory()
+            with self.lock:
+                self.created += 1
+        try:
+            yield client
+        finally:
+            with self.lock:
+                self._idle.append(client)
+
+    @contextlib.asynccontextmanager
+    async def async_client(self):
+        """Check out an async client bound to the running event loop for the duration of the block"""
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            idle = self._idle_async.setdefault(loop, [])
+            client = idle.pop() if idle else None
+        if client is None:
+            client = (self.async_factory or self.factory)()
+            with self.lock:
+                self.created += 1
+        try:
+            yield client
+        finally:
+            with self.lock:
+                self._idle_async.setdefault(loop, []).append(client)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                'created': self.created,
+                'idle': len(self._idle) + sum(len(idle) for idle in self._idle_async.values())
+            }
+
+
+_shared_pools: Dict[Hashable, ClientPool] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_client_pool(key: Hashable, factory: Callable[[], object],
+                       async_factory: Callable[[], object] = None) -> ClientPool:
+    """Return the process-wide pool for key (e.g. API key and model), creating it on first use"""
+    with _shared_lock:
+        if key not in _shared_pools:
+            _shared_pools[key] = ClientPool(factory, async_factory)
+        return _shared_pools[key]
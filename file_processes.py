@@ -0,0 +1,76 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, TYPE_CHECKING
+
+# pandas is imported in the worker that reads or writes, so importing this module stays cheap
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def read_table(path: str) -> 'pd.DataFrame':
+    """Read an Excel or CSV file into a DataFrame"""
+    import pandas as pd
+
+    if path.endswith('.csv'):
+        return pd.read_csv(path)
+    return pd.read_excel(path)
+
+
+def write_table(df: 'pd.DataFrame', path: str):
+    """Write a DataFrame to an Excel or CSV file, chosen by extension"""
+    if path.endswith('.csv'):
+        df.to_csv(path, index=False)
+    else:
+        df.to_excel(path, index=False)
+
+
+def run_in(pool: Optional[ProcessPoolExecutor], function, *args):
+    """Call function(*args) in the process pool and wait for it, or in this thread when pool is None"""
+    if pool is None:
+        return function(*args)
+    try:
+        return pool.submit(function, *args).result()
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory); start a fresh pool for the next caller
+        _discard_pool(pool)
+        raise
+
+
+def default_process_count() -> int:
+    return os.cpu_count() or 1
+
+
+_shared_pool: Optional[ProcessPoolExecutor] = None
+_shared_workers = 0
+_shared_lock = threading.Lock()
+
+
+def shared_process_pool(workers: int = None) -> ProcessPoolExecutor:
+    """Return the process-wide pool for parsing and writing files, with `workers` processes
+
+    Worker processes are spawned rather than forked, since forking a process that already
+    runs the engine loop and writer threads can deadlock, and they are kept between runs so
+    pandas is imported once per process. Asking for a different size replaces the pool.
+    """
+    global _shared_pool, _shared_workers
+    workers = workers or default_process_count()
+    with _shared_lock:
+        if _shared_pool is not None and _shared_workers != workers:
+            _shared_pool.shutdown(wait=False)
+            _shared_pool = None
+        if _shared_pool is None:
+            _shared_pool = ProcessPoolExecutor(max_workers=workers,
+                                               mp_context=multiprocessing.get_context('spawn'))
+            _shared_workers = workers
+        return _shared_pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is pool:
+            _shared_pool = None
+    pool.shutdown(wait=False)
@@ -0,0 +1,197 @@
+import asyncio
+import re
+import threading
+import time
+from typing import List, Optional, Sequence
+
+from rate_limiter import RateLimiter
+from retry_policy import THROTTLE
+from translation_metrics import SUCCESS
+
+
+def parse_api_keys(text) -> List[str]:
+    """Split API keys given as one string (separated by commas, semicolons or whitespace) or a list"""
+    if not text:
+        return []
+    parts = re.split(r'[,;\s]+', text) if isinstance(text, str) else text
+    keys = []
+    for key in parts:
+        key = key.strip()
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def mask_key(key: Optional[str]) -> str:
+    """Short label for a key that is safe to log"""
+    return f"…{key[-4:]}" if key else "default"
+
+
+class PooledKey:
+    """One API key of a KeyPool: its backend, its rate limiter and how it has been doing lately"""
+
+    def __init__(self, key: Optional[str], backend, limiter: RateLimiter):
+        self.key = key
+        self.backend = backend
+        self.limiter = limiter
+        self.label = mask_key(key)
+        self.in_flight = 0
+        self.calls = 0
+        self.throttles = 0
+        self.consecutive_throttles = 0
+        self.cooldowns = 0  # Cooldowns in a row without a success in between
+        self.cooldown_until = 0.0
+
+
+class KeyPool:
+    def __init__(self, keys: Sequence[PooledKey], cooldown: float = 60.0, max_cooldown: float = 900.0,
+                 exhausted_after: int = 3):
+        """
+        Spread requests across several API keys, each with its own quota
+
+        Every request goes to the key it could be sent on soonest under that key's rate limit;
+        ties go to the key with the fewest requests in flight, weighted by how much the key has
+        been throttled lately. A key throttled exhausted_after times in a row is taken out of
+        rotation for a cooldown that doubles each time it happens again, up to max_cooldown.
+
+        The pool also offers the parts of the RateLimiter interface the translator uses
+        (set_delay, configure, stats), applied to the limiter of every key, and a `factor` for
+        the async engine's in-flight limit.
+
+        Args:
+            keys: The keys, usually one PooledKey per API key
+            cooldown (float): Seconds an exhausted key first stays out of rotation
+            max_cooldown (float): Longest cooldown in seconds
+            exhausted_after (int): Throttled calls in a row after which a key counts as exhausted
+        """
+        self.keys = list(keys)
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.exhausted_after = exhausted_after
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _limiters(self) -> List[RateLimiter]:
+        limiters = []
+        for pooled in self.keys:
+            if pooled.limiter not in limiters:
+                limiters.append(pooled.limiter)
+        return limiters
+
+    def _choose(self, tokens: int):
+        """Pick a key and reserve its quota, returning the key and the time to wait before sending"""
+        with self.lock:
+            now = time.monotonic()
+            available = [pooled for pooled in self.keys if pooled.cooldown_until <= now]
+            if available:
+                pooled = min(available, key=lambda pooled: (
+                    pooled.limiter.expected_wait(tokens),
+                    (pooled.in_flight + 1) / pooled.limiter.aimd.factor,
+                    pooled.calls
+                ))
+                cooling = 0.0
+            else:
+                # Every key is cooling down; wait for the first one to come back
+                pooled = min(self.keys, key=lambda pooled: pooled.cooldown_until)
+                cooling = pooled.cooldown_until - now
+
+            pooled.in_flight += 1
+            pooled.calls += 1
+            return pooled, max(cooling, pooled.limiter.reserve(tokens))
+
+    def acquire(self, tokens: int = 1) -> PooledKey:
+        """Block until a request of `tokens` tokens may be sent, returning the key to send it with"""
+        pooled, wait = self._choose(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return pooled
+
+    async def acquire_async(self, tokens: int = 1) -> PooledKey:
+        """Async variant of acquire"""
+        pooled, wait = self._choose(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return pooled
+
+    def release(self, pooled: PooledKey, outcome: str) -> Optional[float]:
+        """
+        Return a key after its request finished with outcome (SUCCESS or an error kind)
+
+        Returns the cooldown in seconds if the key was just taken out of rotation, else None.
+        """
+        if outcome == SUCCESS:
+            pooled.limiter.record_success()
+        elif outcome == THROTTLE:
+            pooled.limiter.record_throttle()
+
+        with self.lock:
+            pooled.in_flight -= 1
+            if outcome == SUCCESS:
+                pooled.consecutive_throttles = 0
+                pooled.cooldowns = 0
+            elif outcome == THROTTLE:
+                pooled.throttles += 1
+                pooled.consecutive_throttles += 1
+                # A single key has no other key to fall back on, so it is never taken out
+                if len(self.keys) > 1 and pooled.consecutive_throttles >= self.exhausted_after:
+                    cooldown = min(self.max_cooldown, self.cooldown * 2 ** pooled.cooldowns)
+                    pooled.cooldowns += 1
+                    pooled.consecutive_throttles = 0
+                    pooled.cooldown_until = time.monotonic() + cooldown
+                    return cooldown
+        return None
+
+    @property
+    def factor(self) -> float:
+        """Average AIMD factor of the keys in rotation, for scaling the in-flight limit"""
+        now = time.monotonic()
+        limiters = [pooled.limiter for pooled in self.keys if pooled.cooldown_until <= now]
+        limiters = limiters or [pooled.limiter for pooled in self.keys]
+        return sum(limiter.aimd.factor for limiter in limiters) / len(limiters)
+
+    @property
+    def requests_per_minute(self) -> Optional[float]:
+        """Request quota of each key"""
+        return self.keys[0].limiter.requests_per_minute
+
+    @property
+    def tokens_per_minute(self) -> Optional[float]:
+        """Token quota of each key"""
+        return self.keys[0].limiter.tokens_per_minute
+
+    def configure(self, requests_per_minute: Optional[float], tokens_per_minute: Optional[float]):
+        """Set the quotas of every key"""
+        for limiter in self._limiters():
+            limiter.configure(requests_per_minute, tokens_per_minute)
+
+    def set_delay(self, delay: float):
+        """Allow one request per `delay` seconds on every key"""
+        for limiter in self._limiters():
+            limiter.set_delay(delay)
+
+    def stats(self) -> dict:
+        """RateLimiter.stats() summed over the keys, with each key's own numbers under 'keys'"""
+        limiter_stats = [limiter.stats() for limiter in self._limiters()]
+        now = time.monotonic()
+        with self.lock:
+            keys = [{
+                'key': pooled.label,
+                'calls': pooled.calls,
+                'throttles': pooled.throttles,
+                'in_flight': pooled.in_flight,
+                'rate_factor': pooled.limiter.aimd.factor,
+                'cooldown_seconds': max(0.0, pooled.cooldown_until - now)
+            } for pooled in self.keys]
+
+        return {
+            'requests_per_minute': self.requests_per_minute,
+            'tokens_per_minute': self.tokens_per_minute,
+            'calls': sum(stats['calls'] for stats in limiter_stats),
+            'throttled_calls': sum(stats['throttled_calls'] for stats in limiter_stats),
+            'waited_seconds': sum(stats['waited_seconds'] for stats in limiter_stats),
+            'rate_factor': self.factor,
+            'throttle_events': sum(stats['throttle_events'] for stats in limiter_stats),
+            'keys': keys
+        }
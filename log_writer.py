@@ -0,0 +1,45 @@
+import os
+import queue
+import threading
+import time
+from typing import List
+
+
+class BackgroundLogWriter:
+    def __init__(self, path: str):
+        """
+        Append log messages to a file from a background thread, so the caller never blocks on disk
+
+        Args:
+            path (str): Log file to append to
+        """
+        self.path = path
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+
+        self._queue = queue.Queue()
+        self._file = open(path, 'a', encoding='utf-8')
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, messages: List[str]):
+        """Queue messages for writing; each is stamped with the time it was queued"""
+        self._queue.put((time.strftime('%Y-%m-%d %H:%M:%S'), messages))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            stamp, messages = item
+            self._file.write("".join(f"{stamp} {message}\n" for message in messages))
+            if self._queue.empty():
+                self._file.flush()
+
+        self._file.close()
+
+    def close(self):
+        """Write out everything queued so far and close the file"""
+        self._queue.put(None)
+        self._thread.join()
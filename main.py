@@ -1,17 +1,24 @@
-import pandas as pd
-import google.generativeai as genai
-import time
 import os
-import glob
-from typing import Optional, List
-from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
-from pathlib import Path
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import queue
 import json
+import contextlib
 from translator import ExcelTranslator
+from run_profiler import RunProfiler
+from log_writer import BackgroundLogWriter
+from progress_events import PROGRESS, format_progress
+from run_planner import RunPlanner
+from key_pool import parse_api_keys
+
+PROFILE_FILE = 'translation_profile.txt'
+LOG_FILE = 'translation_log.txt'
+LOG_MAX_LINES = 5000  # Older lines are dropped from the log window (the log file keeps everything)
+LOG_INTERVAL_MS = 100
+# Folder runs read and write files on threads, or in worker processes (None: one per CPU core)
+FILE_PROCESS_CHOICES = {'threads': 0, 'one per core': None, '2': 2, '4': 4, '8': 8, '16': 16}
+PROGRESS_INTERVAL = 0.5  # Seconds between progress bar updates from the translator
 
 
 class TranslationGUI:
@@ -23,16 +30,27 @@ class TranslationGUI:
 
         # Variables
         self.api_key_var = tk.StringVar()
+        self.model_var = tk.StringVar(value="gemini-pro")
         self.prompt_file_var = tk.StringVar()
+        self.cache_file_var = tk.StringVar()
         self.input_file_var = tk.StringVar()
         self.input_folder_var = tk.StringVar()
         self.output_folder_var = tk.StringVar()
         self.delay_var = tk.DoubleVar(value=1.0)
         self.workers_var = tk.IntVar(value=3)
+        self.batch_size_var = tk.IntVar(value=1)
+        self.resume_var = tk.BooleanVar(value=False)
+        self.overwrite_var = tk.BooleanVar(value=False)
+        self.log_to_file_var = tk.BooleanVar(value=False)
+        self.system_instruction_var = tk.BooleanVar(value=False)
         self.mode_var = tk.StringVar(value="single")
+        self.file_processes_var = tk.StringVar(value="threads")
+        self.profile_enabled = False
 
         # Queue for thread communication
         self.log_queue = queue.Queue()
+        self.log_writer = None
+        self.latest_progress = None  # Last progress snapshot from the translator, drawn on the next tick
 
         # Load saved settings
         self.load_settings()
@@ -40,6 +58,9 @@ class TranslationGUI:
         self.create_widgets()
         self.update_log_display()
 
+        # Hidden toggle for diagnosing slow runs
+        self.root.bind('<Control-Shift-P>', self.toggle_profiling)
+
     def create_widgets(self):
         # Main container with scrolling
         main_frame = ttk.Frame(self.root, padding="10")
@@ -64,13 +85,20 @@ class TranslationGUI:
         api_frame.columnconfigure(1, weight=1)
         current_row += 1
 
-        ttk.Label(api_frame, text="Gemini API Key:").grid(row=0, column=0, sticky=tk.W, padx=(0, 10))
+        ttk.Label(api_frame, text="Gemini API Key(s):").grid(row=0, column=0, sticky=tk.W, padx=(0, 10))
         api_entry = ttk.Entry(api_frame, textvariable=self.api_key_var, show="*", width=50)
         api_entry.grid(row=0, column=1, sticky=(tk.W, tk.E), padx=(0, 10))
 
         ttk.Button(api_frame, text="Show/Hide",
                    command=self.toggle_api_visibility).grid(row=0, column=2)
 
+        ttk.Label(api_frame, text="Separate several keys with commas to spread requests across their quotas",
+                  foreground="gray").grid(row=1, column=1, columnspan=2, sticky=tk.W, pady=(5, 0))
+
+        ttk.Label(api_frame, text="Model:").grid(row=2, column=0, sticky=tk.W, padx=(0, 10), pady=(10, 0))
+        ttk.Entry(api_frame, textvariable=self.model_var, width=30).grid(row=2, column=1, sticky=tk.W,
+                                                                         pady=(10, 0))
+
         # Custom Prompt Section
         prompt_frame = ttk.LabelFrame(main_frame, text="Custom Prompt (Optional)", padding="10")
         prompt_frame.grid(row=current_row, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
@@ -131,22 +159,56 @@ class TranslationGUI:
         ttk.Button(self.batch_frame, text="Browse",
                    command=self.browse_output_folder).grid(row=1, column=2, pady=(10, 0))
 
+        ttk.Label(self.batch_frame, text="Read/write files in:").grid(row=2, column=0, sticky=tk.W, padx=(0, 10),
+                                                                      pady=(10, 0))
+        ttk.Combobox(self.batch_frame, textvariable=self.file_processes_var, values=list(FILE_PROCESS_CHOICES),
+                     state="readonly", width=14).grid(row=2, column=1, sticky=tk.W, pady=(10, 0))
+
         # Settings Section
         settings_frame = ttk.LabelFrame(main_frame, text="Translation Settings", padding="10")
         settings_frame.grid(row=current_row, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
         current_row += 1
 
-        ttk.Label(settings_frame, text="Delay between API calls (seconds):").grid(row=0, column=0, sticky=tk.W,
-                                                                                  padx=(0, 10))
-        delay_spin = ttk.Spinbox(settings_frame, from_=0.5, to=5.0, increment=0.5,
+        ttk.Label(settings_frame, text="Min. delay between API calls (seconds):").grid(row=0, column=0,
+                                                                                       sticky=tk.W, padx=(0, 10))
+        delay_spin = ttk.Spinbox(settings_frame, from_=0.0, to=5.0, increment=0.5,
                                  textvariable=self.delay_var, width=10)
         delay_spin.grid(row=0, column=1, sticky=tk.W)
 
-        ttk.Label(settings_frame, text="Parallel Workers (batch):").grid(row=0, column=2, sticky=tk.W, padx=(20, 10))
+        ttk.Label(settings_frame, text="Parallel Workers:").grid(row=0, column=2, sticky=tk.W, padx=(20, 10))
         workers_spin = ttk.Spinbox(settings_frame, from_=1, to=10, increment=1,
                                    textvariable=self.workers_var, width=10)
         workers_spin.grid(row=0, column=3, sticky=tk.W)
 
+        ttk.Label(settings_frame, text="Rows per API request:").grid(row=1, column=0, sticky=tk.W,
+                                                                     padx=(0, 10), pady=(10, 0))
+        batch_size_spin = ttk.Spinbox(settings_frame, from_=1, to=100, increment=1,
+                                      textvariable=self.batch_size_var, width=10)
+        batch_size_spin.grid(row=1, column=1, sticky=tk.W, pady=(10, 0))
+
+        ttk.Checkbutton(settings_frame, text="Resume previous run",
+                        variable=self.resume_var).grid(row=1, column=2, columnspan=2, sticky=tk.W,
+                                                       padx=(20, 0), pady=(10, 0))
+
+        ttk.Checkbutton(settings_frame, text="Overwrite existing translations",
+                        variable=self.overwrite_var).grid(row=2, column=0, columnspan=2, sticky=tk.W,
+                                                          pady=(10, 0))
+
+        ttk.Checkbutton(settings_frame, text=f"Save full log to {LOG_FILE}",
+                        variable=self.log_to_file_var).grid(row=2, column=2, columnspan=2, sticky=tk.W,
+                                                            padx=(20, 0), pady=(10, 0))
+
+        ttk.Checkbutton(settings_frame, text="Send prompt as system instruction (gemini-1.5+)",
+                        variable=self.system_instruction_var).grid(row=3, column=0, columnspan=2,
+                                                                   sticky=tk.W, pady=(10, 0))
+
+        ttk.Label(settings_frame, text="Translation memory (Optional):").grid(row=4, column=0, sticky=tk.W,
+                                                                              padx=(0, 10), pady=(10, 0))
+        ttk.Entry(settings_frame, textvariable=self.cache_file_var, width=30).grid(row=4, column=1, columnspan=2,
+                                                                                   sticky=(tk.W, tk.E), pady=(10, 0))
+        ttk.Button(settings_frame, text="Browse",
+                   command=self.browse_cache_file).grid(row=4, column=3, sticky=tk.W, padx=(10, 0), pady=(10, 0))
+
         # Control Buttons
         button_frame = ttk.Frame(main_frame)
         button_frame.grid(row=current_row, column=0, columnspan=3, pady=20)
@@ -156,6 +218,10 @@ class TranslationGUI:
                                         command=self.start_translation, style="Accent.TButton")
         self.translate_btn.pack(side=tk.LEFT, padx=(0, 10))
 
+        self.estimate_btn = ttk.Button(button_frame, text="Estimate",
+                                       command=self.start_estimate)
+        self.estimate_btn.pack(side=tk.LEFT, padx=(0, 10))
+
         self.stop_btn = ttk.Button(button_frame, text="Stop",
                                    command=self.stop_translation, state=tk.DISABLED)
         self.stop_btn.pack(side=tk.LEFT, padx=(0, 10))
@@ -197,18 +263,74 @@ class TranslationGUI:
         self.log_queue.put(message)
 
     def update_log_display(self):
-        """Update log display from queue (called periodically)"""
+        """Render queued log messages (called periodically)
+
+        Everything queued since the last tick is drained and inserted in one go, and the widget
+        keeps only the last LOG_MAX_LINES lines, so the GUI stays responsive at any row rate.
+        """
+        messages = []
         try:
             while True:
-                message = self.log_queue.get_nowait()
-                self.log_text.insert(tk.END, f"{message}\n")
-                self.log_text.see(tk.END)
-                self.log_text.update()
+                messages.append(self.log_queue.get_nowait())
         except queue.Empty:
             pass
 
+        self.update_log_file()
+        self.update_progress_display()
+        if messages:
+            if self.log_writer:
+                self.log_writer.write(messages)
+
+            # Only follow the end of the log if the user hasn't scrolled up
+            at_end = self.log_text.yview()[1] >= 1.0
+            self.log_text.insert(tk.END, "\n".join(messages[-LOG_MAX_LINES:]) + "\n")
+
+            lines = int(self.log_text.index('end-1c').split('.')[0])
+            if lines > LOG_MAX_LINES:
+                self.log_text.delete('1.0', f'{lines - LOG_MAX_LINES}.0')
+            if at_end:
+                self.log_text.see(tk.END)
+
         # Schedule next update
-        self.root.after(100, self.update_log_display)
+        self.root.after(LOG_INTERVAL_MS, self.update_log_display)
+
+    def on_translator_event(self, event):
+        """Keep the latest progress snapshot (called from the translation thread)"""
+        if event.kind == PROGRESS:
+            self.latest_progress = event.data
+
+    def update_progress_display(self):
+        """Show the latest progress snapshot on the progress bar and status label"""
+        snapshot, self.latest_progress = self.latest_progress, None
+        if snapshot is None or not snapshot['total']:
+            return
+
+        # Determinate once the first rows are planned
+        if str(self.progress.cget('mode')) != 'determinate':
+            self.progress.stop()
+            self.progress.config(mode='determinate')
+        self.progress.config(maximum=snapshot['total'], value=snapshot['done'])
+        self.progress_var.set(format_progress(snapshot))
+
+    def update_log_file(self):
+        """Open or close the background log file writer to match the checkbox"""
+        if self.log_to_file_var.get() and self.log_writer is None:
+            try:
+                self.log_writer = BackgroundLogWriter(LOG_FILE)
+            except Exception as e:
+                self.log_to_file_var.set(False)
+                self.log(f"Failed to open log file: {str(e)}")
+        elif not self.log_to_file_var.get() and self.log_writer is not None:
+            self.log_writer.close()
+            self.log_writer = None
+
+    def toggle_profiling(self, event=None):
+        """Toggle profiling (cProfile + tracemalloc) of the next runs"""
+        self.profile_enabled = not self.profile_enabled
+        if self.profile_enabled:
+            self.log(f"🔬 Profiling enabled, the report will be saved to {PROFILE_FILE}")
+        else:
+            self.log("🔬 Profiling disabled")
 
     def toggle_api_visibility(self):
         """Toggle API key visibility"""
@@ -233,6 +355,16 @@ class TranslationGUI:
         if file_path:
             self.prompt_file_var.set(file_path)
 
+    def browse_cache_file(self):
+        file_path = filedialog.asksaveasfilename(
+            title="Select Translation Memory",
+            defaultextension=".db",
+            confirmoverwrite=False,  # An existing memory is reused, not replaced
+            filetypes=[("Translation memory", "*.db"), ("All files", "*.*")]
+        )
+        if file_path:
+            self.cache_file_var.set(file_path)
+
     def browse_input_file(self):
         file_path = filedialog.askopenfilename(
             title="Select Excel/CSV File",
@@ -340,9 +472,9 @@ Provide only the Arabic translation, no additional text or explanations."""
         ttk.Button(button_frame, text="Save", command=save_prompt).pack(side=tk.RIGHT, padx=(10, 0))
         ttk.Button(button_frame, text="Cancel", command=editor_window.destroy).pack(side=tk.RIGHT)
 
-    def validate_inputs(self):
+    def validate_inputs(self, require_api_key: bool = True):
         """Validate user inputs before starting translation"""
-        if not self.api_key_var.get().strip():
+        if require_api_key and not parse_api_keys(self.api_key_var.get()):
             messagebox.showerror("Error", "Please enter your Gemini API key")
             return False
 
@@ -367,7 +499,9 @@ Provide only the Arabic translation, no additional text or explanations."""
         self.stop_btn.config(state=tk.NORMAL)
         self.stop_translation_flag = False
 
-        # Start progress bar
+        # Indeterminate until the translator reports how many rows it will translate
+        self.latest_progress = None
+        self.progress.config(mode='indeterminate', value=0)
         self.progress.start()
         self.progress_var.set("Initializing translation...")
 
@@ -378,6 +512,51 @@ Provide only the Arabic translation, no additional text or explanations."""
         translation_thread = threading.Thread(target=self.run_translation, daemon=True)
         translation_thread.start()
 
+    def start_estimate(self):
+        """Estimate requests, tokens and duration of the configured run without calling the API"""
+        if not self.validate_inputs(require_api_key=False):
+            return
+
+        self.estimate_btn.config(state=tk.DISABLED)
+        threading.Thread(target=self.run_estimate, daemon=True).start()
+
+    def run_estimate(self):
+        """Run the dry-run planner in a background thread"""
+        translator = None
+        try:
+            translator = ExcelTranslator(
+                api_key=parse_api_keys(self.api_key_var.get()),
+                model_name=self.model_var.get().strip() or "gemini-pro",
+                system_instruction=self.system_instruction_var.get(),
+                prompt_file=self.prompt_file_var.get() if self.prompt_file_var.get() else None,
+                cache_file=self.cache_file_var.get().strip() or None,
+                log_callback=self.log,
+                checkpoint=True,
+                resume=self.resume_var.get(),
+                skip_translated=not self.overwrite_var.get(),
+                log_level='warning'
+            )
+
+            planner = RunPlanner(translator)
+            if self.mode_var.get() == "single":
+                plan = planner.plan([self.input_file_var.get()], batch_size=self.batch_size_var.get(),
+                                    concurrency=self.workers_var.get(), delay=self.delay_var.get())
+            else:
+                plan = planner.plan([self.input_folder_var.get()], batch_size=self.batch_size_var.get(),
+                                    delay=self.delay_var.get(), max_workers=self.workers_var.get())
+
+            report = planner.report(plan)
+            self.log(report)
+            messagebox.showinfo("Estimate", report)
+
+        except Exception as e:
+            self.log(f"❌ Estimate failed: {str(e)}")
+            messagebox.showerror("Error", f"Estimate failed: {str(e)}")
+        finally:
+            if translator:
+                translator.close()
+            self.root.after(0, lambda: self.estimate_btn.config(state=tk.NORMAL))
+
     def stop_translation(self):
         """Stop the translation process"""
         self.stop_translation_flag = True
@@ -385,22 +564,40 @@ Provide only the Arabic translation, no additional text or explanations."""
 
     def run_translation(self):
         """Run translation in background thread"""
+        translator = None
         try:
             # Create translator
             translator = ExcelTranslator(
-                api_key=self.api_key_var.get(),
+                api_key=parse_api_keys(self.api_key_var.get()),
+                model_name=self.model_var.get().strip() or "gemini-pro",
+                system_instruction=self.system_instruction_var.get(),
                 prompt_file=self.prompt_file_var.get() if self.prompt_file_var.get() else None,
+                cache_file=self.cache_file_var.get().strip() or None,
                 log_callback=self.log,
-                stop_flag_callback=lambda: self.stop_translation_flag
+                event_callback=self.on_translator_event,
+                log_progress=False,  # Shown on the progress bar instead
+                progress_interval=PROGRESS_INTERVAL,
+                stop_flag_callback=lambda: self.stop_translation_flag,
+                checkpoint=True,  # Journals next to each output file, kept until it is complete
+                resume=self.resume_var.get(),
+                skip_translated=not self.overwrite_var.get()
             )
 
+            profiler = RunProfiler(translator, deep=True) if self.profile_enabled else None
+
             if self.mode_var.get() == "single":
                 # Single file processing
                 self.progress_var.set("Translating single file...")
-                result = translator.process_single_file(
-                    input_file_path=self.input_file_var.get(),
-                    delay=self.delay_var.get()
-                )
+                with profiler or contextlib.nullcontext():
+                    result = translator.process_single_file(
+                        input_file_path=self.input_file_var.get(),
+                        delay=self.delay_var.get(),
+                        batch_size=self.batch_size_var.get(),
+                        concurrency=self.workers_var.get()
+                    )
+
+                if profiler:
+                    self.log(profiler.save(PROFILE_FILE, [result]))
 
                 if result['success']:
                     self.log(f"✅ Translation completed! {result['translations_made']} cells translated.")
@@ -416,12 +613,18 @@ Provide only the Arabic translation, no additional text or explanations."""
                 self.progress_var.set("Batch processing files...")
                 output_folder = self.output_folder_var.get() if self.output_folder_var.get() else None
 
-                results = translator.batch_process_folder(
-                    folder_path=self.input_folder_var.get(),
-                    output_folder=output_folder,
-                    max_workers=self.workers_var.get(),
-                    delay=self.delay_var.get()
-                )
+                with profiler or contextlib.nullcontext():
+                    results = translator.batch_process_folder(
+                        folder_path=self.input_folder_var.get(),
+                        output_folder=output_folder,
+                        max_workers=self.workers_var.get(),
+                        delay=self.delay_var.get(),
+                        batch_size=self.batch_size_var.get(),
+                        processes=FILE_PROCESS_CHOICES.get(self.file_processes_var.get(), 0)
+                    )
+
+                if profiler:
+                    self.log(profiler.save(PROFILE_FILE, results))
 
                 # Show summary
                 successful = sum(1 for r in results if r['success'])
@@ -441,6 +644,10 @@ Provide only the Arabic translation, no additional text or explanations."""
             self.log(f"❌ Fatal error: {str(e)}")
             messagebox.showerror("Error", f"Translation failed: {str(e)}")
         finally:
+            # Flush the journal so a stopped run can be resumed
+            if translator:
+                translator.close()
+
             # Re-enable controls
             self.root.after(0, self.translation_finished)
 
@@ -448,8 +655,12 @@ Provide only the Arabic translation, no additional text or explanations."""
         """Called when translation is finished"""
         self.translate_btn.config(state=tk.NORMAL)
         self.stop_btn.config(state=tk.DISABLED)
-        self.progress.stop()
-        self.progress_var.set("Ready")
+        # Leave the final row counts on screen when the run reported any
+        self.update_progress_display()
+        if str(self.progress.cget('mode')) != 'determinate':
+            self.progress.stop()
+            self.progress.config(mode='determinate', value=0)
+            self.progress_var.set("Ready")
 
     def clear_log(self):
         """Clear the log display"""
@@ -458,14 +669,22 @@ Provide only the Arabic translation, no additional text or explanations."""
     def save_settings(self):
         """Save current settings to file"""
         settings = {
-            'api_key': self.api_key_var.get(),
+            'api_keys': parse_api_keys(self.api_key_var.get()),
+            'model': self.model_var.get(),
             'prompt_file': self.prompt_file_var.get(),
+            'cache_file': self.cache_file_var.get(),
             'input_file': self.input_file_var.get(),
             'input_folder': self.input_folder_var.get(),
             'output_folder': self.output_folder_var.get(),
             'delay': self.delay_var.get(),
             'workers': self.workers_var.get(),
-            'mode': self.mode_var.get()
+            'batch_size': self.batch_size_var.get(),
+            'overwrite': self.overwrite_var.get(),
+            'resume': self.resume_var.get(),
+            'log_to_file': self.log_to_file_var.get(),
+            'system_instruction': self.system_instruction_var.get(),
+            'mode': self.mode_var.get(),
+            'processes': FILE_PROCESS_CHOICES.get(self.file_processes_var.get(), 0)
         }
 
         try:
@@ -482,14 +701,26 @@ Provide only the Arabic translation, no additional text or explanations."""
                 with open('translator_settings.json', 'r') as f:
                     settings = json.load(f)
 
-                self.api_key_var.set(settings.get('api_key', ''))
+                # Older settings files hold a single 'api_key'
+                self.api_key_var.set(", ".join(parse_api_keys(settings.get('api_keys') or settings.get('api_key'))))
+                self.model_var.set(settings.get('model', 'gemini-pro'))
                 self.prompt_file_var.set(settings.get('prompt_file', ''))
+                self.cache_file_var.set(settings.get('cache_file', ''))
                 self.input_file_var.set(settings.get('input_file', ''))
                 self.input_folder_var.set(settings.get('input_folder', ''))
                 self.output_folder_var.set(settings.get('output_folder', ''))
                 self.delay_var.set(settings.get('delay', 1.0))
                 self.workers_var.set(settings.get('workers', 3))
+                self.batch_size_var.set(settings.get('batch_size', 1))
+                self.overwrite_var.set(settings.get('overwrite', False))
+                self.resume_var.set(settings.get('resume', False))
+                self.log_to_file_var.set(settings.get('log_to_file', False))
+                self.system_instruction_var.set(settings.get('system_instruction', False))
                 self.mode_var.set(settings.get('mode', 'single'))
+                processes = settings.get('processes', 0)
+                for label, value in FILE_PROCESS_CHOICES.items():
+                    if value == processes:
+                        self.file_processes_var.set(label)
         except Exception as e:
             pass  # Ignore errors loading settings
 
@@ -515,6 +746,8 @@ def main():
     # Handle window closing
     def on_closing():
         app.save_settings()
+        if app.log_writer:
+            app.log_writer.close()
         root.destroy()
 
     root.protocol("WM_DELETE_WINDOW", on_closing)
@@ -0,0 +1,311 @@
+import collections
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, TextIO
+
+# Event levels (same values as the logging module)
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVELS = {'debug': DEBUG, 'info': INFO, 'warning': WARNING, 'error': ERROR}
+
+# Event kinds
+MESSAGE = 'message'
+ROWS_STARTED = 'rows_started'
+ROW_DONE = 'row_done'
+ROW_FAILED = 'row_failed'
+PROGRESS = 'progress'
+
+
+def _format_rows_started(data: dict) -> str:
+    rows = data['rows']
+    if len(rows) == 1:
+        idx, text = rows[0]
+        return f"🔄 Translating row {idx}: '{text[:50]}...'"
+    return f"🔄 Translating rows {rows[0][0]}-{rows[-1][0]} ({len(rows)} rows)"
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """Render seconds as e.g. '45s', '12m 05s' or '3h 20m'; None (unknown) as '--'"""
+    if seconds is None:
+        return "--"
+    seconds = int(seconds + 0.5)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+
+
+def format_progress(data: dict) -> str:
+    """One-line summary of a progress snapshot (see EventEmitter.snapshot)"""
+    percent = f" ({data['done'] / data['total']:.0%})" if data['total'] else ""
+    return (f"{data['done']}/{data['total']} rows{percent}, {data['failed']} failed, "
+            f"{data['cached']} cached | {data['rows_per_second']:.1f} rows/s | "
+            f"ETA {format_duration(data['eta_seconds'])}")
+
+
+def _format_progress(data: dict) -> str:
+    return f"📈 Progress: {format_progress(data)}"
+
+
+_FORMATTERS = {
+    MESSAGE: lambda data: data['text'],
+    ROWS_STARTED: _format_rows_started,
+    ROW_DONE: lambda data: f"✅ Row {data['row']} translated successfully",
+    ROW_FAILED: lambda data: f"❌ Failed to translate row {data['row']}",
+    PROGRESS: _format_progress,
+}
+
+
+class ProgressEvent:
+    """One structured event; `message` renders it as the classic log line on first use"""
+    __slots__ = ('kind', 'level', 'data', 'time', '_message')
+
+    def __init__(self, kind: str, level: int, data: dict):
+        self.kind = kind
+        self.level = level
+        self.data = data
+        self.time = time.time()
+        self._message = None
+
+    @property
+    def message(self) -> str:
+        if self._message is None:
+            self._message = _FORMATTERS[self.kind](self.data)
+        return self._message
+
+
+class _FileProgress:
+    __slots__ = ('total', 'done', 'failed', 'cached')
+
+    def __init__(self):
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self.cached = 0
+
+
+class EventEmitter:
+    def __init__(self, log_consumer: Callable[[ProgressEvent], None] = None,
+                 event_consumers: List[Callable[[ProgressEvent], None]] = None, level: int = INFO,
+                 row_sample: int = 1, progress_interval: float = 2.0, rate_window: float = 30.0):
+        """
+        Emit structured translation events to a log and to event consumers, filtered by level
+
+        Per-row events are DEBUG level and sampled (one in every row_sample is emitted), while
+        aggregated PROGRESS events are emitted at most every progress_interval seconds. Events
+        below the level are never built, so quiet runs pay almost nothing per row. The one
+        exception is PROGRESS: event consumers get it at any level, since progress bars and
+        live progress lines should not go blank just because the log is quiet.
+
+        Throughput is a moving average over the last rate_window seconds, so the ETA follows
+        rate limit changes and slow files instead of the average since the start.
+
+        Args:
+            log_consumer: Callable receiving each ProgressEvent at or above level, to render as a log line
+            event_consumers: Callables receiving the same events plus every PROGRESS event
+            level (int): Minimum level emitted (DEBUG, INFO, WARNING or ERROR)
+            row_sample (int): Emit one in every row_sample per-row events
+            progress_interval (float): Seconds between aggregated progress events
+            rate_window (float): Seconds of history the rows/s and ETA are averaged over
+        """
+        self.log_consumer = log_consumer
+        self.event_consumers = event_consumers if event_consumers else []
+        self.level = level
+        self.row_sample = max(1, row_sample)
+        self.progress_interval = progress_interval
+        self.rate_window = rate_window
+        self.lock = threading.Lock()
+        self.files: Dict[str, _FileProgress] = {}
+        self._row_events: Dict[str, int] = {}
+        self._started = None
+        self._last_progress = 0.0
+        self._cached = 0  # Includes memory hits outside any file
+        self._restored = 0
+        self._samples = collections.deque()  # (time, rows done in this run)
+
+    def enabled(self, level: int) -> bool:
+        return level >= self.level
+
+    def emit(self, kind: str, level: int, **data):
+        if level < self.level:
+            return
+        self._deliver(ProgressEvent(kind, level, data), log=True)
+
+    def _deliver(self, event: ProgressEvent, log: bool):
+        if log and self.log_consumer:
+            self.log_consumer(event)
+        for consumer in self.event_consumers:
+            consumer(event)
+
+    def message(self, text: str, level: int = INFO):
+        """Emit a free-form log message"""
+        self.emit(MESSAGE, level, text=text)
+
+    def _sampled(self, kind: str) -> bool:
+        with self.lock:
+            count = self._row_events.get(kind, 0) + 1
+            self._row_events[kind] = count
+            return count % self.row_sample == 0
+
+    def rows_planned(self, file_path: str, count: int, restored: int = 0):
+        """Add rows that are about to be translated to a file's total
+
+        restored rows (finished by an earlier run) count as done and cached right away, but
+        not towards the throughput.
+        """
+        with self.lock:
+            if self._started is None:
+                self._started = time.monotonic()
+            progress = self.files.setdefault(os.path.abspath(file_path), _FileProgress())
+            progress.total += count + restored
+            progress.done += restored
+            progress.cached += restored
+            self._cached += restored
+            self._restored += restored
+
+    def rows_cached(self, file_path: Optional[str], count: int):
+        """count rows were answered from the translation memory instead of the API"""
+        with self.lock:
+            self._cached += count
+            if file_path:
+                self.files.setdefault(os.path.abspath(file_path), _FileProgress()).cached += count
+
+    def rows_started(self, rows: List[tuple]):
+        """A request for (row index, text) pairs is being sent"""
+        if self.enabled(DEBUG) and self._sampled(ROWS_STARTED):
+            self.emit(ROWS_STARTED, DEBUG, rows=rows)
+
+    def row_finished(self, file_path: str, row, success: bool):
+        """A row got its translation (or failed for good)"""
+        with self.lock:
+            progress = self.files.setdefault(os.path.abspath(file_path), _FileProgress())
+            progress.done += 1
+            if not success:
+                progress.failed += 1
+
+        if self.enabled(DEBUG) and self._sampled(ROW_DONE):
+            self.emit(ROW_DONE if success else ROW_FAILED, DEBUG, file=file_path, row=row)
+        self.progress()
+
+    def _rate(self, now: float, translated: int) -> float:
+        """Rows per second over the last rate_window seconds; call with the lock held"""
+        samples = self._samples
+        if not samples or now - samples[-1][0] >= 1.0:
+            samples.append((now, translated))
+        while len(samples) > 2 and now - samples[1][0] >= self.rate_window:
+            samples.popleft()
+
+        since, translated_then = samples[0]
+        if now - since >= 1.0:
+            return (translated - translated_then) / (now - since)
+        # Too little history for a window yet, use the average since the start once it means something
+        elapsed = now - self._started
+        return translated / elapsed if elapsed >= 1.0 else 0.0
+
+    def snapshot(self) -> dict:
+        """Aggregated progress of the run and of each file, with the current rows/s and ETA
+
+        total counts the rows planned so far; in folder runs it grows as files are read.
+        """
+        with self.lock:
+            now = time.monotonic()
+            done = sum(progress.done for progress in self.files.values())
+            total = sum(progress.total for progress in self.files.values())
+            if self._started is None:
+                elapsed, rate = 0.0, 0.0
+            else:
+                elapsed = now - self._started
+                rate = self._rate(now, done - self._restored)
+            return {
+                'done': done,
+                'failed': sum(progress.failed for progress in self.files.values()),
+                'cached': self._cached,
+                'total': total,
+                'remaining': max(0, total - done),
+                'elapsed': elapsed,
+                'rows_per_second': rate,
+                'eta_seconds': max(0, total - done) / rate if rate > 0 else None,
+                'files': {path: {'done': progress.done, 'failed': progress.failed,
+                                 'cached': progress.cached, 'total': progress.total}
+                          for path, progress in self.files.items()}
+            }
+
+    def progress(self, force: bool = False):
+        """Emit an aggregated PROGRESS event if progress_interval has passed (or force is set)
+
+        The event reaches the log only when INFO is enabled, but event consumers always.
+        """
+        log = self.enabled(INFO)
+        if not log and not self.event_consumers:
+            return
+
+        now = time.monotonic()
+        with self.lock:
+            if not force and now - self._last_progress < self.progress_interval:
+                return
+            self._last_progress = now
+
+        self._deliver(ProgressEvent(PROGRESS, INFO, self.snapshot()), log)
+
+
+def level_from_name(name: Optional[str]) -> int:
+    """Parse a level name such as 'info'; None means INFO"""
+    if name is None:
+        return INFO
+    try:
+        return LEVELS[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown log level '{name}', expected one of {', '.join(LEVELS)}")
+
+
+class ConsoleProgress:
+    def __init__(self, stream: TextIO = None):
+        """
+        Single progress line that updates in place at the bottom of a terminal
+
+        Log messages written through write() scroll above it. Use write as the translator's
+        log_callback and update as its event_callback, with log_progress off.
+
+        Args:
+            stream: Terminal stream to write to (sys.stdout when None)
+        """
+        self.stream = stream if stream else sys.stdout
+        self.lock = threading.Lock()
+        self.line = ""
+
+    @staticmethod
+    def supported(stream: TextIO = None) -> bool:
+        """Whether stream is a terminal that can redraw a line in place"""
+        stream = stream if stream else sys.stdout
+        return hasattr(stream, 'isatty') and stream.isatty()
+
+    def write(self, message: str):
+        """Print a log message above the progress line"""
+        with self.lock:
+            self.stream.write(f"\r\033[K{message}\n")
+            if self.line:
+                self.stream.write(self.line)
+            self.stream.flush()
+
+    def update(self, event: ProgressEvent):
+        """Redraw the progress line from a PROGRESS event; other events are ignored"""
+        if event.kind != PROGRESS:
+            return
+        with self.lock:
+            self.line = f"📈 {format_progress(event.data)}"
+            self.stream.write(f"\r\033[K{self.line}")
+            self.stream.flush()
+
+    def finish(self):
+        """Leave the last progress line on screen and move below it"""
+        with self.lock:
+            if self.line:
+                self.stream.write("\n")
+                self.stream.flush()
+                self.line = ""
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+from retry_policy import AIMDController
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for tokens-per-minute accounting (about 4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+class _Bucket:
+    """A token bucket that may go into debt, so each caller learns exactly how long to wait"""
+
+    def __init__(self, per_minute: float, capacity: float):
+        self.base_rate = per_minute / 60.0
+        self.rate = self.base_rate
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        self.level -= amount
+        return -self.level / self.rate if self.level < 0 else 0.0
+
+    def peek(self, amount: float, now: float) -> float:
+        """The wait reserve() would return, without reserving anything"""
+        level = min(self.capacity, self.level + (now - self.updated) * self.rate) - amount
+        return -level / self.rate if level < 0 else 0.0
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute: float = None, tokens_per_minute: float = None, burst: int = 1):
+        """
+        Shared requests-per-minute / tokens-per-minute limiter
+
+        Args:
+            requests_per_minute (float): Request quota (unlimited when None)
+            tokens_per_minute (float): Token quota (unlimited when None)
+            burst (int): Number of requests that may be sent back to back when the bucket is full
+        """
+        self.lock = threading.Lock()
+        self.aimd = AIMDController()
+        self.burst = max(1, burst)
+        self.requests_per_minute = None
+        self.tokens_per_minute = None
+        self._requests = None
+        self._tokens = None
+        self.waited_seconds = 0.0
+        self.calls = 0
+        self.throttled_calls = 0
+        self.configure(requests_per_minute, tokens_per_minute)
+
+    def configure(self, requests_per_minute: Optional[float], tokens_per_minute: Optional[float]):
+        """Change the quotas; None (or 0) disables that limit"""
+        with self.lock:
+            if requests_per_minute != self.requests_per_minute:
+                self.requests_per_minute = requests_per_minute or None
+                self._requests = _Bucket(requests_per_minute, self.burst) if requests_per_minute else None
+            if tokens_per_minute != self.tokens_per_minute:
+                self.tokens_per_minute = tokens_per_minute or None
+                self._tokens = _Bucket(tokens_per_minute, tokens_per_minute / 60.0) if tokens_per_minute else None
+            self._apply_factor(self.aimd.factor)
+
+    def _apply_factor(self, factor: float):
+        for bucket in (self._requests, self._tokens):
+            if bucket:
+                bucket.rate = bucket.base_rate * factor
+
+    def record_success(self):
+        """Let the rate creep back up after a successful call"""
+        factor = self.aimd.on_success()
+        with self.lock:
+            self._apply_factor(factor)
+
+    def record_throttle(self):
+        """Cut the effective rate after the API reported throttling"""
+        factor = self.aimd.on_throttle()
+        with self.lock:
+            self._apply_factor(factor)
+
+    def set_delay(self, delay: float):
+        """Map the legacy 'delay between API calls' setting onto a requests-per-minute quota"""
+        self.configure(60.0 / delay if delay and delay > 0 else None, self.tokens_per_minute)
+
+    def expected_wait(self, tokens: int = 1) -> float:
+        """Seconds a request of `tokens` tokens would wait if it were sent now"""
+        now = time.monotonic()
+        with self.lock:
+            return max([bucket.peek(amount, now)
+                        for bucket, amount in ((self._requests, 1), (self._tokens, tokens)) if bucket] or [0.0])
+
+    def reserve(self, tokens: int) -> float:
+        """Reserve quota for a request of `tokens` tokens, returning how long the caller must wait before sending"""
+        now = time.monotonic()
+        with self.lock:
+            wait = 0.0
+            if self._requests:
+                wait = max(wait, self._requests.reserve(1, now))
+            if self._tokens:
+                wait = max(wait, self._tokens.reserve(tokens, now))
+
+            self.calls += 1
+            if wait > 0:
+                self.throttled_calls += 1
+                self.waited_seconds += wait
+            return wait
+
+    def acquire(self, tokens: int = 1) -> float:
+        """Block until a request of `tokens` tokens may be sent, returning the time waited"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: int = 1) -> float:
+        """Async variant of acquire"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def stats(self) -> dict:
+        """Return the configured quotas and how much waiting the limiter added"""
+        with self.lock:
+            return {
+                'requests_per_minute': self.requests_per_minute,
+                'tokens_per_minute': self.tokens_per_minute,
+                'calls': self.calls,
+                'throttled_calls': self.throttled_calls,
+                'waited_seconds': self.waited_seconds,
+                'rate_factor': self.aimd.factor,
+                'throttle_events': self.aimd.throttle_events
+            }
+
+
+_shared_limiters: Dict[Optional[str], RateLimiter] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_rate_limiter(api_key: str = None) -> RateLimiter:
+    """Return the process-wide rate limiter shared by all translators and workers
+
+    With api_key, return that key's own limiter instead, since every key has its own quota.
+    """
+    with _shared_lock:
+        if api_key not in _shared_limiters:
+            _shared_limiters[api_key] = RateLimiter()
+        return _shared_limiters[api_key]
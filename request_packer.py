@@ -0,0 +1,86 @@
+from typing import List, Optional, Sequence, Tuple
+
+# JSON quoting, the comma and the newline around each item of a batch request or reply
+ITEM_OVERHEAD_TOKENS = 3
+
+
+class TokenEstimator:
+    def __init__(self, chars_per_token: float = 4.0, output_ratio: float = 1.5):
+        """
+        Cheap local token estimate, calibrated against the backend's token counting when available
+
+        Args:
+            chars_per_token (float): Source characters per token (about 4 for English)
+            output_ratio (float): Translation tokens per source token (Arabic usually needs more)
+        """
+        self.chars_per_token = chars_per_token
+        self.output_ratio = output_ratio
+
+    def estimate(self, text: str) -> int:
+        """Estimated tokens of a source text"""
+        return max(1, int(len(text) / self.chars_per_token + 0.5))
+
+    def estimate_output(self, text: str) -> int:
+        """Estimated tokens of the translation of a source text"""
+        return max(1, int(self.estimate(text) * self.output_ratio + 0.5))
+
+    def calibrate(self, text: str, token_count: int):
+        """Set chars_per_token from the API's token count for a sample text"""
+        if token_count > 0 and text:
+            self.chars_per_token = len(text) / token_count
+
+
+class RequestPacker:
+    def __init__(self, max_input_tokens: int, max_output_tokens: int = 2048, overhead_tokens: int = 0,
+                 estimator: TokenEstimator = None, safety_margin: float = 0.9):
+        """
+        Pack rows into requests by estimated token count instead of a fixed number of rows
+
+        Args:
+            max_input_tokens (int): Input token budget per request, prompt included
+            max_output_tokens (int): The model's maximum output tokens per reply
+            overhead_tokens (int): Tokens of the prompt template around the rows
+            estimator (TokenEstimator): Token estimator (a default one when None)
+            safety_margin (float): Fraction of each budget actually filled, since estimates are approximate
+        """
+        self.max_input_tokens = max_input_tokens
+        self.max_output_tokens = max_output_tokens
+        self.overhead_tokens = overhead_tokens
+        self.estimator = estimator if estimator else TokenEstimator()
+        self.safety_margin = safety_margin
+
+    def pack(self, rows: Sequence[Tuple[int, str]], max_rows: Optional[int] = None) -> List[List[Tuple[int, str]]]:
+        """
+        Group (row index, text) pairs into request batches that fit the token budgets
+
+        Rows are sorted by size and filled greedily, so rows of similar length share a request
+        and a batch that fails to parse splits into similar halves. A row too large for the
+        budget on its own still gets a request to itself.
+        """
+        input_budget = max(1, self.max_input_tokens * self.safety_margin - self.overhead_tokens)
+        output_budget = max(1, self.max_output_tokens * self.safety_margin)
+
+        sized = sorted(
+            ((self.estimator.estimate(text) + ITEM_OVERHEAD_TOKENS,
+              self.estimator.estimate_output(text) + ITEM_OVERHEAD_TOKENS, (row, text))
+             for row, text in rows),
+            key=lambda item: item[0]
+        )
+
+        batches = []
+        batch, batch_input, batch_output = [], 0, 0
+        for input_tokens, output_tokens, row in sized:
+            full = batch and (batch_input + input_tokens > input_budget or
+                              batch_output + output_tokens > output_budget or
+                              (max_rows and len(batch) >= max_rows))
+            if full:
+                batches.append(batch)
+                batch, batch_input, batch_output = [], 0, 0
+            batch.append(row)
+            batch_input += input_tokens
+            batch_output += output_tokens
+        if batch:
+            batches.append(batch)
+
+        # Restore row order inside each request
+        return [sorted(batch, key=lambda row: row[0]) for batch in batches]
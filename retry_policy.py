@@ -0,0 +1,87 @@
+import asyncio
+import random
+import threading
+import time
+
+# Error kinds returned by classify_error
+THROTTLE = 'throttle'
+TRANSIENT = 'transient'
+FATAL = 'fatal'
+
+_THROTTLE_NAMES = {'ResourceExhausted', 'TooManyRequests'}
+_TRANSIENT_NAMES = {'ServiceUnavailable', 'DeadlineExceeded', 'InternalServerError', 'Aborted',
+                    'GatewayTimeout', 'BadGateway', 'RetryError', 'Unknown'}
+_THROTTLE_CODES = {429}
+_TRANSIENT_CODES = {408, 500, 502, 503, 504}
+
+
+def classify_error(error: Exception) -> str:
+    """Classify an API error as THROTTLE, TRANSIENT (both retryable) or FATAL"""
+    # Backend errors carry their own classification
+    kind = getattr(error, 'kind', None)
+    if kind in (THROTTLE, TRANSIENT, FATAL):
+        return kind
+
+    name = type(error).__name__
+    code = getattr(error, 'code', None)
+
+    if name in _THROTTLE_NAMES or code in _THROTTLE_CODES:
+        return THROTTLE
+    if name in _TRANSIENT_NAMES or code in _TRANSIENT_CODES:
+        return TRANSIENT
+    if isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return TRANSIENT
+
+    # Errors raised without a status code still mention the quota in their message
+    message = str(error).lower()
+    if '429' in message or 'quota' in message or 'rate limit' in message:
+        return THROTTLE
+
+    return FATAL
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Exponential backoff with full jitter for the given (zero-based) retry attempt"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class AIMDController:
+    def __init__(self, min_factor: float = 0.05, increase: float = 0.01, decrease: float = 0.5,
+                 cooldown: float = 2.0):
+        """
+        Additive-increase / multiplicative-decrease control of the request rate
+
+        factor scales the configured rate and in-flight limit: it is cut by `decrease` when the
+        API throttles us and grows by `increase` after each success, up to 1.0.
+
+        Args:
+            min_factor (float): Lowest factor the controller will cut down to
+            increase (float): Amount added to the factor per successful call
+            decrease (float): Multiplier applied to the factor on throttling
+            cooldown (float): Seconds during which further throttles count as the same event
+        """
+        self.lock = threading.Lock()
+        self.min_factor = min_factor
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.factor = 1.0
+        self.throttle_events = 0
+        self._last_cut = 0.0
+
+    def on_success(self) -> float:
+        """Record a successful call, returning the new factor"""
+        with self.lock:
+            self.factor = min(1.0, self.factor + self.increase)
+            return self.factor
+
+    def on_throttle(self) -> float:
+        """Record a throttled call, returning the new factor"""
+        with self.lock:
+            # Concurrent requests tend to be throttled together; cut once per burst
+            now = time.monotonic()
+            if now - self._last_cut >= self.cooldown:
+                self.factor = max(self.min_factor, self.factor * self.decrease)
+                self._last_cut = now
+                self.throttle_events += 1
+            return self.factor
@@ -0,0 +1,196 @@
+import os
+from typing import List
+
+from progress_events import format_duration
+from request_packer import ITEM_OVERHEAD_TOKENS, TokenEstimator
+from translation_memory import normalize_text
+
+
+class RunPlanner:
+    def __init__(self, translator, request_latency: float = 2.0):
+        """
+        Estimate a translation run without calling the API: rows, requests, tokens and wall time
+
+        Files are read and batched exactly as a real run would, using the translator's row
+        selection, journal, translation memory, batching and rate limit settings. Tokens are
+        local estimates from the translator's token estimator (not calibrated here, since
+        that needs an API call).
+
+        Args:
+            translator (ExcelTranslator): Translator whose settings are planned for
+            request_latency (float): Assumed seconds per API request, used for the wall time
+        """
+        self.translator = translator
+        self.request_latency = request_latency
+
+    def plan(self, paths: List[str], batch_size: int = 1, concurrency: int = 1, delay: float = 1.0,
+             max_workers: int = 1) -> dict:
+        """
+        Plan a run over input files (folders are expanded to their Excel/CSV files)
+
+        batch_size, concurrency, delay and max_workers mean the same as for process_single_file
+        and batch_process_folder; pass max_workers > 1 to plan a folder run.
+        """
+        files = []
+        for path in paths:
+            files.extend(self.translator.find_input_files(path) if os.path.isdir(path) else [path])
+
+        translator = self.translator
+        estimator = translator.estimator
+        self._seen = set()
+        self._unique = set()
+
+        file_plans = [self._plan_file(path, batch_size, estimator) for path in files]
+
+        totals = {key: sum(file_plan.get(key, 0) for file_plan in file_plans)
+                  for key in ('rows', 'flagged_rows', 'rows_to_translate', 'restored_rows',
+                              'memory_hits', 'duplicate_hits', 'rows_sent', 'requests',
+                              'input_tokens', 'output_tokens')}
+        totals['unique_strings'] = len(self._unique)
+
+        plan = {
+            'files': file_plans,
+            'totals': totals,
+            'settings': {
+                'batch_size': batch_size,
+                'token_budget': translator.packer.max_input_tokens if translator.packer else None,
+                'concurrency': concurrency,
+                'max_workers': max_workers,
+                'delay': delay,
+                'request_latency': self.request_latency,
+                'translation_memory': translator.memory is not None,
+            },
+        }
+        plan['projection'] = self._project(totals, concurrency, delay, max_workers)
+        return plan
+
+    def _plan_file(self, path: str, batch_size: int, estimator: TokenEstimator) -> dict:
+        import pandas as pd
+
+        translator = self.translator
+        file_plan = {'file': path, 'error': None}
+        try:
+            df = pd.read_csv(path) if path.endswith('.csv') else pd.read_excel(path)
+        except Exception as e:
+            file_plan['error'] = str(e)
+            return file_plan
+
+        file_plan['rows'] = len(df)
+        if len(df.columns) < 5:
+            file_plan['error'] = "File must have at least 5 columns"
+            return file_plan
+
+        file_plan['flagged_rows'] = int((df.iloc[:, translator.CHECK_COL_IDX] == 1).sum())
+        indices, texts = translator._select_rows(df)
+        pending = list(zip(indices.tolist(), texts.tolist()))
+        file_plan['rows_to_translate'] = len(pending)
+        self._unique.update(normalize_text(text) for _, text in pending)
+
+        journal = translator._journal_for(translator._default_output_path(path)) if translator.resume else None
+        if journal and journal.entries:
+            missing = [(idx, text) for idx, text in pending
+                       if journal.lookup(path, idx, text) is None]
+            file_plan['restored_rows'] = len(pending) - len(missing)
+            pending = missing
+
+        if translator.packer:
+            batches = translator.packer.pack(pending, max_rows=batch_size if batch_size > 1 else None)
+        else:
+            batch_size = max(1, batch_size)
+            batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+
+        known = translator.memory.known({text for _, text in pending}) if translator.memory else set()
+        memory_hits = duplicate_hits = rows_sent = requests = input_tokens = output_tokens = 0
+        for batch in batches:
+            sent = []
+            for _, text in batch:
+                if text in known:
+                    memory_hits += 1
+                elif translator.memory and normalize_text(text) in self._seen:
+                    # Translated by an earlier request of this run and remembered by then
+                    duplicate_hits += 1
+                else:
+                    sent.append(text)
+
+            if translator.memory:
+                self._seen.update(normalize_text(text) for text in sent)
+            if not sent:
+                continue
+
+            requests += 1
+            rows_sent += len(sent)
+            input_tokens += translator.backend.estimate_request_tokens(sent, estimator)
+            output_tokens += sum(estimator.estimate_output(text) for text in sent)
+            if len(sent) > 1:
+                output_tokens += ITEM_OVERHEAD_TOKENS * len(sent)
+
+        file_plan.update(memory_hits=memory_hits, duplicate_hits=duplicate_hits, rows_sent=rows_sent,
+                         requests=requests, input_tokens=input_tokens, output_tokens=output_tokens)
+        return file_plan
+
+    def _project(self, totals: dict, concurrency: int, delay: float, max_workers: int) -> dict:
+        """Projected wall time: the slowest of request latency, the request quota and the token quota
+
+        Quotas are the totals over all API keys.
+        """
+        requests = totals['requests']
+        parallel = max(1, min(self.translator.max_in_flight, max(1, max_workers) * max(1, concurrency)))
+        # Every API key has its own quota
+        keys = len(self.translator.keys)
+        requests_per_minute = 60.0 * keys / delay if delay and delay > 0 else None
+        tokens_per_minute = self.translator.keys.tokens_per_minute
+        tokens_per_minute = tokens_per_minute * keys if tokens_per_minute else None
+
+        limits = {'request latency': requests * self.request_latency / parallel}
+        if requests_per_minute:
+            limits['requests per minute'] = max(0, requests - 1) * 60.0 / requests_per_minute
+        if tokens_per_minute:
+            limits['tokens per minute'] = totals['input_tokens'] * 60.0 / tokens_per_minute
+
+        bottleneck = max(limits, key=limits.get)
+        return {
+            'wall_seconds': limits[bottleneck],
+            'bottleneck': bottleneck,
+            'limits': limits,
+            'parallel_requests': parallel,
+            'api_keys': keys,
+            'requests_per_minute': requests_per_minute,
+            'tokens_per_minute': tokens_per_minute,
+        }
+
+    @staticmethod
+    def report(plan: dict) -> str:
+        """Render a plan as a human-readable summary"""
+        totals = plan['totals']
+        settings = plan['settings']
+        projection = plan['projection']
+
+        if settings['token_budget']:
+            batching = f"up to {settings['token_budget']} input tokens per request"
+        else:
+            batching = f"{max(1, settings['batch_size'])} rows per request"
+
+        lines = [
+            f"📋 Plan for {len(plan['files'])} files ({totals['rows']} rows), no API calls made",
+            f"   - Flagged rows: {totals['flagged_rows']}",
+            f"   - Rows to translate: {totals['rows_to_translate']} ({totals['unique_strings']} unique strings)",
+        ]
+        if totals['restored_rows']:
+            lines.append(f"   - Restored from the journal: {totals['restored_rows']}")
+        if settings['translation_memory']:
+            lines.append(f"   - Expected translation memory hits: {totals['memory_hits'] + totals['duplicate_hits']} "
+                         f"({totals['memory_hits']} already stored, {totals['duplicate_hits']} repeats in this run)")
+        lines += [
+            f"   - API requests: {totals['requests']} for {totals['rows_sent']} rows ({batching})",
+            f"   - Estimated tokens: {totals['input_tokens']} input, {totals['output_tokens']} output",
+            f"   - Projected wall time: {format_duration(projection['wall_seconds'])} "
+            f"(limited by {projection['bottleneck']}; concurrency {projection['parallel_requests']}, "
+            f"{projection['api_keys']} API key{'s' if projection['api_keys'] > 1 else ''}, "
+            f"{settings['request_latency']:.1f}s per request assumed)",
+        ]
+
+        failed = [file_plan for file_plan in plan['files'] if file_plan['error']]
+        if failed:
+            lines.append(f"❌ {len(failed)} files can't be translated:")
+            lines += [f"  - {os.path.basename(file_plan['file'])}: {file_plan['error']}" for file_plan in failed]
+        return "\n".join(lines)
@@ -0,0 +1,167 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from typing import List
+
+from async_engine import shared_event_loop
+
+
+class RunProfiler:
+    def __init__(self, translator, deep: bool = False, top: int = 25):
+        """
+        Profile a translation run: phase times, where the wall time went and, optionally,
+        hot functions (cProfile) and allocations (tracemalloc)
+
+        Use as a context manager around process_single_file / batch_process_folder, then call
+        report() or save() with the results.
+
+        Args:
+            translator (ExcelTranslator): The translator whose run is profiled
+            deep (bool): Also run cProfile and tracemalloc (slows the run down noticeably)
+            top (int): Number of functions and allocation sites listed in the report
+        """
+        self.translator = translator
+        self.deep = deep
+        self.top = top
+        self.lock = threading.Lock()
+        self._profile = None
+        self._thread_profiles = []
+        self._loop_profile = None
+        self._stats_snapshot = None
+        self._snapshot = None
+        self._peak_memory = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+
+    def _profile_thread(self, *args):
+        # First profile event of a thread started while profiling: give the thread its own profiler
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        with self.lock:
+            self._thread_profiles.append(profile)
+        profile.enable()
+
+    def _start_loop_profile(self):
+        self._loop_profile = cProfile.Profile()
+        with self.lock:
+            self._thread_profiles.append(self._loop_profile)
+        self._loop_profile.enable()
+
+    @staticmethod
+    def _on_loop(function, timeout: float = 5.0):
+        """Run function on the shared engine loop thread and wait for it"""
+        done = threading.Event()
+
+        def run():
+            try:
+                function()
+            finally:
+                done.set()
+
+        shared_event_loop().call_soon_threadsafe(run)
+        done.wait(timeout)
+
+    def __enter__(self):
+        metrics = self.translator.metrics()
+        self._start_wait = metrics['rate_limiter']['waited_seconds']
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+
+        if self.deep:
+            tracemalloc.start()
+            self._thread_profiles = []
+            # Before 3.12 cProfile only sees the thread that enabled it, so worker threads get
+            # their own profilers as they start. The engine loop thread outlives runs, so its
+            # profiler is enabled and disabled on the loop itself for every run.
+            if sys.version_info < (3, 12):
+                self._on_loop(self._start_loop_profile)
+                threading.setprofile(self._profile_thread)
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.wall_seconds = time.perf_counter() - self._start_wall
+        self.cpu_seconds = time.process_time() - self._start_cpu
+
+        if self.deep:
+            self._profile.disable()
+            if sys.version_info < (3, 12):
+                threading.setprofile(None)
+                if self._loop_profile:
+                    self._on_loop(self._loop_profile.disable)
+                    self._loop_profile = None
+                with self.lock:
+                    # Threads started during the run have mostly ended with it; this also
+                    # freezes the stats of any that are still running
+                    for profile in self._thread_profiles:
+                        profile.disable()
+            self._stats_snapshot = self._stats()
+            self._peak_memory = tracemalloc.get_traced_memory()[1]
+            self._snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+        return False
+
+    def _stats(self) -> pstats.Stats:
+        stats = pstats.Stats(self._profile, stream=io.StringIO())
+        with self.lock:
+            for profile in self._thread_profiles:
+                stats.add(profile)
+        return stats
+
+    def report(self, results: List[dict]) -> str:
+        """Build the text report for the profiled run"""
+        metrics = self.translator.metrics()
+        run = metrics['run']
+        throttle_wait = metrics['rate_limiter']['waited_seconds'] - self._start_wait
+
+        lines = ["=" * 60, "🔬 PROFILE REPORT", "=" * 60]
+
+        lines.append("\nPhases (seconds):")
+        for result in results:
+            phases = result.get('phase_times', {})
+            lines.append(f"  {os.path.basename(result['file'])}: " +
+                         ", ".join(f"{phase} {seconds:.2f}" for phase, seconds in phases.items()))
+
+        lines.append("\nWhere the time went (seconds):")
+        lines.append(f"  Wall time:                {self.wall_seconds:.2f}")
+        lines.append(f"  CPU time (all threads):   {self.cpu_seconds:.2f}")
+        lines.append(f"  Waiting on the API:       {run['latency_seconds']['sum']:.2f} "
+                     f"({run['calls']} requests, p50 {run['latency_seconds']['p50'] or 0:.2f}s, "
+                     f"p95 {run['latency_seconds']['p95'] or 0:.2f}s)")
+        lines.append(f"  Rate limit sleep:         {throttle_wait:.2f}")
+        lines.append(f"  Retry backoff sleep:      {run['backoff_seconds']:.2f} ({run['retries']} retries)")
+        lines.append("  (API and sleep times are summed over concurrent requests, so they can exceed wall time)")
+
+        if self.deep:
+            stats = self._stats_snapshot
+            for order, title in (('tottime', 'own time'), ('cumulative', 'cumulative time')):
+                lines.append(f"\nHot functions (top {self.top} by {title}, all threads):")
+                output = io.StringIO()
+                stats.stream = output
+                stats.sort_stats(order).print_stats(self.top)
+                lines.append(output.getvalue().strip())
+
+            lines.append(f"\nMemory: peak traced {self._peak_memory / (1024 * 1024):.1f} MB")
+            lines.append(f"Largest allocation sites still live at the end (top {self.top}):")
+            for stat in self._snapshot.statistics('lineno')[:self.top]:
+                lines.append(f"  {stat.size / 1024:10.1f} KiB  {stat.count:8d} blocks  {stat.traceback}")
+
+        return "\n".join(lines)
+
+    def save(self, path: str, results: List[dict]) -> str:
+        """Write the report to path (and raw cProfile stats next to it) and return the report"""
+        report = self.report(results)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(report + "\n")
+
+        if self.deep:
+            # Loadable with pstats, snakeviz and similar tools
+            self._stats_snapshot.dump_stats(os.path.splitext(path)[0] + '.pstats')
+
+        return report
@@ -0,0 +1,130 @@
+"""
+Tests for batched requests: parsing batch replies and splitting batches whose reply does not parse
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from backends import BatchFormatError, PromptBackend, SimulatedBackend  # noqa: E402
+from rate_limiter import RateLimiter  # noqa: E402
+from translator import ExcelTranslator  # noqa: E402
+
+
+class PickyBackend(SimulatedBackend):
+    """Simulated backend whose batch replies only parse for up to max_batch texts"""
+
+    def __init__(self, max_batch: int):
+        super().__init__(latency=0, latency_jitter=0)
+        self.max_batch = max_batch
+        self.requests = []
+
+    def translate(self, text):
+        self.requests.append([text])
+        return super().translate(text)
+
+    def translate_batch(self, texts):
+        self.requests.append(list(texts))
+        if len(texts) > self.max_batch:
+            raise BatchFormatError("Simulated malformed batch reply")
+        return super().translate_batch(texts)
+
+    async def translate_async(self, text):
+        return self.translate(text)
+
+    async def translate_batch_async(self, texts):
+        return self.translate_batch(texts)
+
+
+def make_translator(backend, **kwargs):
+    # A private limiter keeps the process-wide one (and its quota) out of the tests
+    return ExcelTranslator(None, backend=backend, rate_limiter=RateLimiter(), log_callback=lambda message: None,
+                           retry_base_delay=0, **kwargs)
+
+
+def test_parse_batch_reply():
+    assert PromptBackend.parse_batch_reply('["أ", " ب "]', 2) == ['أ', 'ب']
+
+
+def test_parse_batch_reply_strips_code_fence():
+    reply = '```json\n["one", "two"]\n```'
+    assert PromptBackend.parse_batch_reply(reply, 2) == ['one', 'two']
+
+
+@pytest.mark.parametrize('reply', [
+    'Here are the translations: ["one", "two"]',  # Not JSON
+    '["one"]',  # Too few items
+    '["one", "two", "three"]',  # Too many items
+    '{"0": "one", "1": "two"}',  # Not an array
+    '["one", 2]',  # Not all strings
+    '```',  # An empty code fence
+])
+def test_parse_batch_reply_rejects_malformed_replies(reply):
+    with pytest.raises(BatchFormatError):
+        PromptBackend.parse_batch_reply(reply, 2)
+
+
+def test_build_batch_prompt_round_trips_special_characters():
+    backend = PromptBackend("Translate: {text}")
+    texts = ['Say "hi"', 'a\nb', 'back\\slash']
+    prompt = backend.build_batch_prompt(texts)
+    assert 'exactly 3 translated strings' in prompt
+    assert PromptBackend.parse_batch_reply(prompt[prompt.index('['):], 3) == texts
+
+
+def test_unparsable_batch_is_split_in_half():
+    backend = PickyBackend(max_batch=2)
+    translator = make_translator(backend)
+    texts = [f"item {i}" for i in range(5)]
+
+    translations = translator.translate_batch(texts, delay=0)
+
+    assert translations == [SimulatedBackend.fake_translation(text) for text in texts]
+    # 5 fails, then 2 + 3; the 3 fails again and becomes 1 + 2
+    assert [len(request) for request in backend.requests] == [5, 2, 3, 1, 2]
+    translator.close()
+
+
+def test_unparsable_batch_is_split_in_half_async():
+    backend = PickyBackend(max_batch=1)
+    translator = make_translator(backend)
+    texts = [f"item {i}" for i in range(4)]
+
+    translations = asyncio.run(translator.translate_batch_async(texts, delay=0))
+
+    assert translations == [SimulatedBackend.fake_translation(text) for text in texts]
+    assert sorted(len(request) for request in backend.requests) == [1, 1, 1, 1, 2, 2, 4]
+    translator.close()
+
+
+def test_repeated_texts_are_sent_once(tmp_path):
+    backend = PickyBackend(max_batch=10)
+    translator = make_translator(backend, cache_file=str(tmp_path / 'memory.db'))
+
+    translations = translator.translate_batch(['x', 'y', 'x ', 'z'], delay=0)
+
+    assert translations == ['[ar] x', '[ar] y', '[ar] x', '[ar] z']
+    assert backend.requests == [['x', 'y', 'z']]
+    translator.close()
+
+
+def test_single_leftover_text_is_looked_up_once(tmp_path):
+    backend = PickyBackend(max_batch=10)
+    translator = make_translator(backend, cache_file=str(tmp_path / 'memory.db'))
+
+    texts = ['x', 'y', 'x', 'z']
+    for start in range(0, len(texts), 2):
+        translator.translate_batch(texts[start:start + 2], delay=0)
+
+    stats = translator.cache_stats()
+    assert (stats['hits'], stats['misses']) == (1, 3)
+    assert backend.requests == [['x', 'y'], ['z']]
+    translator.close()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,123 @@
+"""
+Tests for CheckpointJournal: replay after a crash, the source hash check and completion
+"""
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from checkpoint_journal import CheckpointJournal, source_hash  # noqa: E402
+
+
+def write_rows(path, rows):
+    journal = CheckpointJournal(str(path))
+    for row, text, translation in rows:
+        journal.record('catalog.xlsx', row, text, translation)
+    journal.close()
+
+
+def test_replays_recorded_rows(tmp_path):
+    path = tmp_path / 'out.xlsx.journal.jsonl'
+    write_rows(path, [(0, 'Red shirt', 'قميص أحمر'), (3, 'Blue hat', 'قبعة زرقاء')])
+
+    journal = CheckpointJournal(str(path), resume=True)
+
+    assert journal.lookup('catalog.xlsx', 0, 'Red shirt') == 'قميص أحمر'
+    assert journal.lookup('catalog.xlsx', 3, 'Blue hat') == 'قبعة زرقاء'
+    assert journal.lookup('catalog.xlsx', 1, 'Red shirt') is None
+    assert journal.lookup('other.xlsx', 0, 'Red shirt') is None
+    journal.close()
+
+
+def test_truncated_last_line_is_skipped(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    write_rows(path, [(0, 'Red shirt', 'قميص أحمر'), (1, 'Blue hat', 'قبعة زرقاء')])
+    # A crash in the middle of a write leaves half a line behind
+    with open(path, 'rb+') as f:
+        f.truncate(os.path.getsize(path) - 10)
+
+    journal = CheckpointJournal(str(path), resume=True)
+
+    assert journal.lookup('catalog.xlsx', 0, 'Red shirt') == 'قميص أحمر'
+    assert journal.lookup('catalog.xlsx', 1, 'Blue hat') is None
+    assert len(journal.entries) == 1
+    journal.close()
+
+
+def test_changed_source_text_is_not_restored(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    write_rows(path, [(0, 'Red shirt', 'قميص أحمر')])
+
+    journal = CheckpointJournal(str(path), resume=True)
+
+    assert journal.lookup('catalog.xlsx', 0, 'Red shirt (new)') is None
+    with open(path, encoding='utf-8') as f:
+        assert json.loads(f.readline())['hash'] == source_hash('Red shirt')
+    journal.close()
+
+
+def test_later_record_of_a_row_wins(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    write_rows(path, [(0, 'Red shirt', 'old'), (0, 'Red shirt', 'new')])
+
+    journal = CheckpointJournal(str(path), resume=True)
+
+    assert journal.lookup('catalog.xlsx', 0, 'Red shirt') == 'new'
+    journal.close()
+
+
+def test_opening_without_resume_keeps_the_journal(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    write_rows(path, [(0, 'Red shirt', 'قميص أحمر')])
+
+    journal = CheckpointJournal(str(path))
+    assert journal.entries == {}
+    assert journal.pending_rows() == 1
+    journal.record('catalog.xlsx', 1, 'Blue hat', 'قبعة زرقاء')
+    journal.close()
+
+    journal = CheckpointJournal(str(path), resume=True)
+    assert len(journal.entries) == 2
+    journal.close()
+
+
+def test_file_is_created_on_first_record(tmp_path):
+    path = tmp_path / 'sub' / 'journal.jsonl'
+
+    journal = CheckpointJournal(str(path))
+    journal.flush()
+    assert not path.exists()
+
+    journal.record('catalog.xlsx', 0, 'Red shirt', 'قميص أحمر')
+    journal.flush()
+    assert path.exists()
+    journal.close()
+
+
+def test_completed_files_are_not_replayed(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    journal = CheckpointJournal(str(path))
+    journal.record('catalog.xlsx', 0, 'Red shirt', 'قميص أحمر')
+    journal.record('other.xlsx', 0, 'Blue hat', 'قبعة زرقاء')
+    journal.complete('catalog.xlsx')
+    journal.close()
+
+    journal = CheckpointJournal(str(path), resume=True)
+
+    assert journal.lookup('catalog.xlsx', 0, 'Red shirt') is None
+    assert journal.lookup('other.xlsx', 0, 'Blue hat') == 'قبعة زرقاء'
+    journal.discard()
+    assert not path.exists()
+
+
+def test_default_path_follows_the_output_file():
+    assert CheckpointJournal.default_path('out/catalog_translated.xlsx') == \
+        'out/catalog_translated.xlsx.journal.jsonl'
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
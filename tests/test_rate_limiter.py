@@ -0,0 +1,107 @@
+"""
+Tests for the token bucket wait maths of RateLimiter
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from rate_limiter import RateLimiter, _Bucket, estimate_tokens  # noqa: E402
+
+
+def test_bucket_starts_full_and_goes_into_debt():
+    bucket = _Bucket(per_minute=60, capacity=2)  # One per second, two back to back
+
+    assert bucket.reserve(1, now=bucket.updated) == 0.0
+    assert bucket.reserve(1, now=bucket.updated) == 0.0
+    # Each further caller waits one more second than the one before
+    assert bucket.reserve(1, now=bucket.updated) == pytest.approx(1.0)
+    assert bucket.reserve(1, now=bucket.updated) == pytest.approx(2.0)
+
+
+def test_bucket_refills_over_time_up_to_capacity():
+    bucket = _Bucket(per_minute=60, capacity=2)
+    start = bucket.updated
+    bucket.reserve(2, now=start)
+
+    assert bucket.peek(1, now=start + 0.5) == pytest.approx(0.5)
+    assert bucket.peek(1, now=start + 1.0) == 0.0
+    # A long idle period refills only up to capacity
+    assert bucket.reserve(2, now=start + 100) == 0.0
+    assert bucket.reserve(1, now=start + 100) == pytest.approx(1.0)
+
+
+def test_peek_does_not_reserve():
+    bucket = _Bucket(per_minute=60, capacity=1)
+    now = bucket.updated
+
+    assert bucket.peek(1, now) == 0.0
+    assert bucket.peek(1, now) == 0.0
+    assert bucket.reserve(1, now) == 0.0
+    assert bucket.peek(1, now) == pytest.approx(1.0)
+
+
+def test_requests_per_minute_spaces_requests():
+    limiter = RateLimiter(requests_per_minute=120)  # One every 0.5s
+
+    waits = [limiter.reserve(1) for _ in range(4)]
+
+    assert waits[0] == 0.0
+    assert waits[1:] == pytest.approx([0.5, 1.0, 1.5], abs=0.01)
+    stats = limiter.stats()
+    assert (stats['calls'], stats['throttled_calls']) == (4, 3)
+    assert stats['waited_seconds'] == pytest.approx(3.0, abs=0.03)
+
+
+def test_tokens_per_minute_limits_large_requests():
+    limiter = RateLimiter(tokens_per_minute=6000)  # 100 tokens per second, 100 token burst
+
+    assert limiter.reserve(100) == 0.0
+    assert limiter.reserve(300) == pytest.approx(3.0, abs=0.01)
+    assert limiter.expected_wait(100) == pytest.approx(4.0, abs=0.01)
+
+
+def test_slowest_quota_decides_the_wait():
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=6000)
+
+    limiter.reserve(50)
+    # The request bucket needs 1s, the token bucket 0.5s
+    assert limiter.reserve(100) == pytest.approx(1.0, abs=0.01)
+
+
+def test_unlimited_never_waits():
+    limiter = RateLimiter()
+
+    assert all(limiter.reserve(10 ** 6) == 0.0 for _ in range(10))
+    assert limiter.expected_wait(10 ** 6) == 0.0
+
+
+def test_set_delay_maps_to_requests_per_minute():
+    limiter = RateLimiter()
+
+    limiter.set_delay(2.0)
+    assert limiter.requests_per_minute == 30
+    limiter.set_delay(0)
+    assert limiter.requests_per_minute is None
+
+
+def test_throttling_slows_the_rate_down():
+    limiter = RateLimiter(requests_per_minute=60)
+    limiter.reserve(1)
+
+    limiter.record_throttle()  # Halves the rate
+
+    assert limiter.stats()['rate_factor'] == pytest.approx(0.5)
+    assert limiter.reserve(1) == pytest.approx(2.0, abs=0.02)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens('') == 1
+    assert estimate_tokens('x' * 40) == 10
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,104 @@
+"""
+Tests for RequestPacker: packing rows into requests by the input and output token budgets
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from request_packer import ITEM_OVERHEAD_TOKENS, RequestPacker, TokenEstimator  # noqa: E402
+
+# 36 characters: 9 input tokens and 14 output tokens, 12 and 17 with the item overhead
+TEXT = 'x' * 36
+
+
+def rows_of(count, text=TEXT):
+    return [(row, text) for row in range(count)]
+
+
+def batch_sizes(batches):
+    return [len(batch) for batch in batches]
+
+
+def test_estimator():
+    estimator = TokenEstimator()
+
+    assert estimator.estimate(TEXT) == 9
+    assert estimator.estimate_output(TEXT) == 14
+    assert estimator.estimate('') == 1
+
+
+def test_calibrate_sets_chars_per_token():
+    estimator = TokenEstimator()
+
+    estimator.calibrate('x' * 30, 10)
+    assert estimator.chars_per_token == pytest.approx(3.0)
+    assert estimator.estimate(TEXT) == 12
+    # A count of zero or an empty sample keeps the current ratio
+    estimator.calibrate('', 10)
+    estimator.calibrate('x' * 30, 0)
+    assert estimator.chars_per_token == pytest.approx(3.0)
+
+
+def test_input_budget_limits_rows_per_request():
+    packer = RequestPacker(max_input_tokens=40, max_output_tokens=10 ** 6, safety_margin=1.0)
+
+    # 3 rows of 12 tokens fit in 40, a 4th does not
+    assert batch_sizes(packer.pack(rows_of(7))) == [3, 3, 1]
+
+
+def test_prompt_overhead_counts_against_the_input_budget():
+    packer = RequestPacker(max_input_tokens=52, max_output_tokens=10 ** 6, overhead_tokens=12,
+                           safety_margin=1.0)
+
+    assert batch_sizes(packer.pack(rows_of(7))) == [3, 3, 1]
+
+
+def test_output_budget_limits_rows_per_request():
+    packer = RequestPacker(max_input_tokens=10 ** 6, max_output_tokens=40, safety_margin=1.0)
+
+    # 2 replies of 17 tokens fit in 40, a 3rd does not
+    assert batch_sizes(packer.pack(rows_of(5))) == [2, 2, 1]
+
+
+def test_safety_margin_shrinks_the_budgets():
+    packer = RequestPacker(max_input_tokens=40, max_output_tokens=10 ** 6, safety_margin=0.5)
+
+    assert batch_sizes(packer.pack(rows_of(3))) == [1, 1, 1]
+
+
+def test_max_rows_caps_a_request():
+    packer = RequestPacker(max_input_tokens=10 ** 6, max_output_tokens=10 ** 6)
+
+    assert batch_sizes(packer.pack(rows_of(5), max_rows=2)) == [2, 2, 1]
+    assert batch_sizes(packer.pack(rows_of(5))) == [5]
+
+
+def test_oversized_row_gets_a_request_to_itself():
+    packer = RequestPacker(max_input_tokens=40, max_output_tokens=10 ** 6, safety_margin=1.0)
+    rows = [(0, TEXT), (1, 'y' * 400), (2, TEXT)]
+
+    batches = packer.pack(rows)
+
+    assert batches == [[(0, TEXT), (2, TEXT)], [(1, 'y' * 400)]]
+    assert packer.estimator.estimate('y' * 400) + ITEM_OVERHEAD_TOKENS > 40
+
+
+def test_similar_lengths_share_a_request_in_row_order():
+    packer = RequestPacker(max_input_tokens=10 ** 6, max_output_tokens=10 ** 6)
+    rows = [(0, 'a' * 200), (1, 'b'), (2, 'c' * 210), (3, 'd' * 2)]
+
+    batches = packer.pack(rows, max_rows=2)
+
+    assert batches == [[(1, 'b'), (3, 'd' * 2)], [(0, 'a' * 200), (2, 'c' * 210)]]
+
+
+def test_no_rows_no_requests():
+    assert RequestPacker(max_input_tokens=100).pack([]) == []
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
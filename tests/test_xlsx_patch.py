@@ -0,0 +1,229 @@
+"""
+Tests for xlsx_patch: in-place edits of one worksheet column
+
+Workbooks are built with openpyxl, and edge cases openpyxl never writes (self-closing rows,
+unusual cell layouts) are spliced into the worksheet XML directly.
+"""
+import os
+import re
+import sys
+import zipfile
+
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from xlsx_patch import column_letter, patch_xlsx_column  # noqa: E402
+
+SHEET = 'xl/worksheets/sheet1.xml'
+HEADER = ['sku', 'title', 'color', 'size', 'check', 'arabic']
+
+
+def make_workbook(path, rows, header=HEADER, second_sheet=None, start_row=1):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = 'Products'
+    for offset, values in enumerate([header] + rows):
+        for column, value in enumerate(values, start=1):
+            if value is not None:
+                sheet.cell(row=start_row + offset, column=column, value=value)
+    if second_sheet:
+        other = workbook.create_sheet('Notes')
+        for values in second_sheet:
+            other.append(values)
+    workbook.save(path)
+    return path
+
+
+def rewrite_parts(path, transforms, added=None):
+    """Replace archive members with transforms[name](xml), and add the members in added"""
+    with zipfile.ZipFile(path) as source:
+        parts = [(info, source.read(info)) for info in source.infolist()]
+    with zipfile.ZipFile(path, 'w') as target:
+        for info, data in parts:
+            if info.filename in transforms:
+                data = transforms[info.filename](data.decode('utf-8')).encode('utf-8')
+            target.writestr(info, data, compress_type=info.compress_type)
+        for name, xml in (added or {}).items():
+            target.writestr(name, xml)
+
+
+def use_shared_strings(path, cells):
+    """Turn inline string cells into shared string cells, as Excel writes them"""
+    strings = []
+
+    def share(xml):
+        for ref in cells:
+            cell = re.search(rf'<c r="{ref}"[^>]*?t="inlineStr"[^>]*><is><t>(.*?)</t></is></c>', xml)
+            strings.append(cell.group(1))
+            xml = xml.replace(cell.group(0), f'<c r="{ref}" t="s"><v>{len(strings) - 1}</v></c>')
+        return xml
+
+    def register(xml):
+        return xml.replace('</Types>', '<Override PartName="/xl/sharedStrings.xml" ContentType="application/'
+                                       'vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/></Types>')
+
+    def link(xml):
+        return xml.replace('</Relationships>', '<Relationship Id="rIdShared" Target="sharedStrings.xml" '
+                                               'Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+                                               'relationships/sharedStrings"/></Relationships>')
+
+    rewrite_parts(path, {SHEET: share, '[Content_Types].xml': register, 'xl/_rels/workbook.xml.rels': link})
+    items = ''.join(f'<si><t>{text}</t></si>' for text in strings)
+    rewrite_parts(path, {}, {'xl/sharedStrings.xml': (
+        '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        f'count="{len(strings)}" uniqueCount="{len(strings)}">{items}</sst>')})
+
+
+def read_member(path, member=SHEET):
+    with zipfile.ZipFile(path) as archive:
+        return archive.read(member).decode('utf-8')
+
+
+def cell_values(path, sheet_name='Products'):
+    sheet = load_workbook(path)[sheet_name]
+    return [[cell.value for cell in row] for row in sheet.iter_rows()]
+
+
+def test_column_letter():
+    assert [column_letter(i) for i in (0, 5, 25, 26, 701, 702)] == ['A', 'F', 'Z', 'AA', 'ZZ', 'AAA']
+
+
+def test_replaces_shared_string_cell(tmp_path):
+    source = make_workbook(tmp_path / 'in.xlsx', [['S1', 'Red shirt', 'red', 'M', 1, 'old'],
+                                                  ['S2', 'Blue hat', 'blue', 'L', 1, 'keep']])
+    use_shared_strings(source, ['F2', 'F3'])
+    assert cell_values(source)[2][5] == 'keep'
+    output = tmp_path / 'out.xlsx'
+
+    assert patch_xlsx_column(str(source), str(output), 5, {0: 'قميص أحمر'}, 2)
+
+    assert cell_values(output) == [HEADER,
+                                   ['S1', 'Red shirt', 'red', 'M', 1, 'قميص أحمر'],
+                                   ['S2', 'Blue hat', 'blue', 'L', 1, 'keep']]
+    xml = read_member(output)
+    assert '<c r="F2" t="inlineStr">' in xml
+    assert '<c r="F3" t="s"><v>1</v></c>' in xml
+
+
+def test_inserts_missing_cell_in_column_order(tmp_path):
+    source = make_workbook(tmp_path / 'in.xlsx', [['S1', 'Red shirt', None, 'M', 1, 'x']])
+    output = tmp_path / 'out.xlsx'
+
+    assert patch_xlsx_column(str(source), str(output), 2, {0: 'أحمر'}, 1)
+
+    assert cell_values(output)[1] == ['S1', 'Red shirt', 'أحمر', 'M', 1, 'x']
+    # Excel rejects rows whose cells are out of column order
+    row = re.search(r'<row r="2".*?</row>', read_member(output)).group(0)
+    assert re.findall(r'<c r="([A-Z]+)2"', row) == ['A', 'B', 'C', 'D', 'E', 'F']
+
+
+def test_appends_missing_cell_at_end_of_row(tmp_path):
+    source = make_workbook(tmp_path / 'in.xlsx', [['S1', 'Red shirt', 'red', 'M', 1]])
+    output = tmp_path / 'out.xlsx'
+
+    assert patch_xlsx_column(str(source), str(output), 5, {0: 'قميص'}, 1)
+
+    assert cell_values(output)[1] == ['S1', 'Red shirt', 'red', 'M', 1, 'قميص']
+
+
+def test_self_closing_cell_and_row(tmp_path):
+    source = tmp_path / 'in.xlsx'
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(HEADER)
+    sheet.append(['S1', 'Red shirt', 'red', 'M', 1])
+    sheet['F2'].font = Font(bold=True)  # Styled but empty: a self-closing cell
+    workbook.save(source)
+    # A formatted empty row after the data, as Excel writes it
+    rewrite_parts(source, {SHEET: lambda xml: xml.replace(
+        '</sheetData>', '<row r="3" spans="1:6" ht="24" customHeight="1"/></sheetData>')})
+    assert re.search(r'<c r="F2" s="\d+"[^>]*/>', read_member(source))
+    output = tmp_path / 'out.xlsx'
+
+    assert patch_xlsx_column(str(source), str(output), 5, {0: 'قميص'}, 1)
+
+    xml = read_member(output)
+    assert re.search(r'<c r="F2" s="\d+" t="inlineStr">', xml)
+    assert '<row r="3" spans="1:6" ht="24" customHeight="1"/>' in xml
+    patched = load_workbook(output).active
+    assert patched['F2'].value == 'قميص'
+    assert patched['F2'].font.bold
+
+
+def test_formula_cell_falls_back(tmp_path):
+    source = make_workbook(tmp_path / 'in.xlsx', [['S1', 'Red shirt', 'red', 'M', 1, '=B2']])
+    output = tmp_path / 'out.xlsx'
+
+    assert not patch_xlsx_column(str(source), str(output), 5, {0: 'قميص'}, 1)
+    assert not output.exists()
+
+
+def test_blank_row_falls_back(tmp_path):
+    # pd.read_excel skips the blank row, so positions no longer map to row numbers
+    source = make_workbook(tmp_path / 'in.xlsx', [['S1', 'Red shirt', 'red', 'M', 1, 'a'],
+                                                  [None] * 6,
+                                                  ['S2', 'Blue hat', 'blue', 'L', 1, 'b']])
+    output = tmp_path / 'out.xlsx'
+
+    assert not patch_xlsx_column(str(source), str(output), 5, {1: 'قبعة'}, 2)
+    assert not output.exists()
+
+
+def test_offset_header_falls_back(tmp_path):
+    source = make_workbook(tmp_path / 'in.xlsx', [['S1', 'Red shirt', 'red', 'M', 1, 'a']], start_row=2)
+    output = tmp_path / 'out.xlsx'
+
+    assert not patch_xlsx_column(str(source), str(output), 5, {0: 'قميص'}, 1)
+    assert not output.exists()
+
+
+def test_row_count_mismatch_falls_back(tmp_path):
+    source = make_workbook(tmp_path / 'in.xlsx', [['S1', 'Red shirt', 'red', 'M', 1, 'a']])
+    output = tmp_path / 'out.xlsx'
+
+    assert not patch_xlsx_column(str(source), str(output), 5, {0: 'قميص'}, 2)
+
+
+def test_escapes_xml_and_drops_control_characters(tmp_path):
+    source = make_workbook(tmp_path / 'in.xlsx', [['S1', 'Red shirt', 'red', 'M', 1, 'a']])
+    output = tmp_path / 'out.xlsx'
+    text = 'Tom & Jerry <"2-pack"> \x01done\x1f'
+
+    assert patch_xlsx_column(str(source), str(output), 5, {0: text}, 1)
+
+    assert 'Tom &amp; Jerry &lt;"2-pack"&gt; done' in read_member(output)
+    assert cell_values(output)[1][5] == 'Tom & Jerry <"2-pack"> done'
+
+
+def test_other_sheets_and_parts_are_copied_unchanged(tmp_path):
+    source = make_workbook(tmp_path / 'in.xlsx', [['S1', 'Red shirt', 'red', 'M', 1, 'a']],
+                           second_sheet=[['note', 'value'], ['owner', 'catalog team']])
+    output = tmp_path / 'out.xlsx'
+
+    assert patch_xlsx_column(str(source), str(output), 5, {0: 'قميص'}, 1)
+
+    with zipfile.ZipFile(source) as before, zipfile.ZipFile(output) as after:
+        assert before.namelist() == after.namelist()
+        for name in before.namelist():
+            if name != SHEET:
+                assert before.read(name) == after.read(name), name
+    assert cell_values(output, 'Notes') == [['note', 'value'], ['owner', 'catalog team']]
+    assert cell_values(output)[1][5] == 'قميص'
+
+
+def test_patches_in_place(tmp_path):
+    source = make_workbook(tmp_path / 'in.xlsx', [['S1', 'Red shirt', 'red', 'M', 1, 'a'],
+                                                  ['S2', 'Blue hat', 'blue', 'L', 1, 'b']])
+
+    assert patch_xlsx_column(str(source), str(source), 5, {0: 'قميص', 1: 'قبعة'}, 2)
+
+    assert [row[5] for row in cell_values(source)] == ['arabic', 'قميص', 'قبعة']
+    assert [name for name in os.listdir(tmp_path)] == ['in.xlsx']
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -1,7 +1,13 @@
 import argparse
+import contextlib
 import os
 import sys
 from translator import ExcelTranslator
+from backends import SimulatedBackend
+from run_profiler import RunProfiler
+from progress_events import ConsoleProgress
+from run_planner import RunPlanner
+from key_pool import parse_api_keys
 
 def main():
     """
@@ -14,13 +20,46 @@ def main():
 
     parser.add_argument(
         "input_file",
-        help="Path to the input Excel or CSV file."
+        help="Path to the input Excel or CSV file (or, with --plan, a folder of them)."
     )
     parser.add_argument(
         "--api-key",
         dest="api_key",
-        help="Your Google Gemini API key. Recommended to use GEMINI_API_KEY environment variable instead.",
-        default=os.environ.get("GEMINI_API_KEY")
+        help="Your Google Gemini API key, or several comma-separated keys to spread requests across their quotas.\n"
+             "Recommended to use the GEMINI_API_KEYS or GEMINI_API_KEY environment variable instead.\n"
+             "--delay/--rpm/--tpm apply to each key, so use --workers of at least the number of keys.",
+        default=os.environ.get("GEMINI_API_KEYS") or os.environ.get("GEMINI_API_KEY")
+    )
+    parser.add_argument(
+        "--model",
+        default="gemini-pro",
+        help="Gemini model to use. (Default: gemini-pro)"
+    )
+    parser.add_argument(
+        "--system-instruction",
+        dest="system_instruction",
+        action="store_true",
+        help="Send the prompt as a system instruction instead of in every message (gemini-1.5 and later).\nGemini still bills it on every request, so this does not lower the token count."
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["gemini", "simulated"],
+        default="gemini",
+        help="Translation backend. (Default: gemini)\n'simulated' runs offline with fake translations, for testing and load tests."
+    )
+    parser.add_argument(
+        "--sim-latency",
+        dest="sim_latency",
+        type=float,
+        default=0.2,
+        help="Mean latency in seconds of the simulated backend. (Default: 0.2)"
+    )
+    parser.add_argument(
+        "--sim-failure-rate",
+        dest="sim_failure_rate",
+        type=float,
+        default=0.0,
+        help="Fraction of simulated calls that fail with a retryable error. (Default: 0.0)"
     )
     parser.add_argument(
         "--prompt-file",
@@ -31,7 +70,144 @@ def main():
         "--delay",
         type=float,
         default=1.0,
-        help="Delay in seconds between API calls. (Default: 1.0)"
+        help="Minimum delay in seconds between API calls, shared by all workers. (Default: 1.0)\nCalls only wait when the rate limit is reached; 0 disables the request limit."
+    )
+    parser.add_argument(
+        "--rpm",
+        type=float,
+        help="Requests-per-minute quota. (Optional)\nOverrides --delay when given."
+    )
+    parser.add_argument(
+        "--tpm",
+        type=float,
+        help="Tokens-per-minute quota. (Optional)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of rows translated concurrently. (Default: 1)\nAll workers share the rate limit set by --delay/--rpm."
+    )
+    parser.add_argument(
+        "--max-retries",
+        dest="max_retries",
+        type=int,
+        default=5,
+        help="Retries for quota (429) and transient API errors before a row fails. (Default: 5)"
+    )
+    parser.add_argument(
+        "--batch-size",
+        dest="batch_size",
+        type=int,
+        default=1,
+        help="Number of rows to translate per API request. (Default: 1)\nLarger values send flagged rows together as one JSON array."
+    )
+    parser.add_argument(
+        "--token-budget",
+        dest="token_budget",
+        type=int,
+        help="Pack rows into requests by estimated tokens, up to this many input tokens per request. (Optional)\nReplaces the fixed --batch-size, which then only caps the rows per request."
+    )
+    parser.add_argument(
+        "--max-output-tokens",
+        dest="max_output_tokens",
+        type=int,
+        default=2048,
+        help="Output token limit of the model; packed requests keep their replies under it. (Default: 2048)"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        dest="chunk_size",
+        type=int,
+        help="Stream CSV files in chunks of this many rows. (Optional)\nKeeps memory bounded for very large catalogs; output is written as each chunk finishes."
+    )
+    parser.add_argument(
+        "--cache-file",
+        dest="cache_file",
+        help="Path to a translation memory database. (Optional)\nPreviously translated text is reused instead of calling the API."
+    )
+    parser.add_argument(
+        "--cache-max-entries",
+        dest="cache_max_entries",
+        type=int,
+        help="Maximum number of entries kept in the translation memory. (Optional)"
+    )
+    parser.add_argument(
+        "--cache-max-age-days",
+        dest="cache_max_age_days",
+        type=float,
+        help="Drop translation memory entries older than this many days. (Optional)"
+    )
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Translate flagged rows again even if their Arabic cell is already filled."
+    )
+    parser.add_argument(
+        "--journal-file",
+        dest="journal_file",
+        help="Path to one checkpoint journal of finished rows. (Default: <output file>.journal.jsonl)\nThe journal is kept until the file has been translated completely."
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume an interrupted run: rows already in the journal are restored instead of translated again."
+    )
+    parser.add_argument(
+        "--metrics-file",
+        dest="metrics_file",
+        help="Save per-request latency, token and retry metrics to this file. (Optional)\nWritten in Prometheus text format for .prom/.txt files, as JSON otherwise."
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="basic",
+        choices=["basic", "full"],
+        help="Profile the run and write a report. (Optional)\n'basic' times each phase and splits the time into CPU, API wait and throttling sleep;\n'full' also runs cProfile and tracemalloc (slower)."
+    )
+    parser.add_argument(
+        "--profile-file",
+        dest="profile_file",
+        default="translation_profile.txt",
+        help="Where to write the profile report. (Default: translation_profile.txt)"
+    )
+    parser.add_argument(
+        "--log-level",
+        dest="log_level",
+        default="info",
+        choices=["debug", "info", "warning", "error"],
+        help="Least severe messages to show. (Default: info)\n'info' reports aggregated progress; 'debug' adds a line per row."
+    )
+    parser.add_argument(
+        "--log-every",
+        dest="log_every",
+        type=int,
+        default=1,
+        help="With --log-level debug, show one in every N per-row messages. (Default: 1)"
+    )
+    parser.add_argument(
+        "--progress-interval",
+        dest="progress_interval",
+        type=float,
+        help="Seconds between progress updates. (Default: 0.5 for the live progress line, 2.0 for progress messages)"
+    )
+    parser.add_argument(
+        "--no-progress-line",
+        dest="progress_line",
+        action="store_false",
+        help="Print progress as log messages instead of a single updating line (the default when output is not a terminal)."
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Dry run: report flagged rows, unique strings, translation memory hits, requests, tokens\nand projected wall time under the current settings, without calling the API."
+    )
+    parser.add_argument(
+        "--plan-latency",
+        dest="plan_latency",
+        type=float,
+        default=2.0,
+        help="Seconds per API request assumed by --plan for the wall time. (Default: 2.0)"
     )
     parser.add_argument(
         "-o", "--output-file",
@@ -41,7 +217,7 @@ def main():
 
     args = parser.parse_args()
 
-    if not args.api_key:
+    if args.backend == "gemini" and not parse_api_keys(args.api_key) and not args.plan:
         print("Error: Gemini API key not found.")
         print("Please provide it using the --api-key argument or by setting the GEMINI_API_KEY environment variable.")
         sys.exit(1)
@@ -50,35 +226,143 @@ def main():
         print(f"Error: Input file not found at '{args.input_file}'")
         sys.exit(1)
 
+    if args.rpm:
+        args.delay = 60.0 / args.rpm
+
+    if args.plan:
+        plan(args)
+        return
+
     print("--- Starting Translation ---")
 
+    backend = None
+    if args.backend == "simulated":
+        backend = SimulatedBackend(latency=args.sim_latency, failure_rate=args.sim_failure_rate)
+
+    # Progress updates in place on a terminal; redirected output gets progress messages instead
+    console = ConsoleProgress() if args.progress_line and ConsoleProgress.supported() else None
+    if args.progress_interval is None:
+        args.progress_interval = 0.5 if console else 2.0
+
     # Instantiate the translator
     try:
         translator = ExcelTranslator(
-            api_key=args.api_key,
+            api_key=parse_api_keys(args.api_key),
+            prompt_file=args.prompt_file,
+            log_callback=console.write if console else print,  # Log messages directly to the console
+            event_callback=console.update if console else None,
+            log_progress=console is None,
+            cache_file=args.cache_file,
+            cache_max_entries=args.cache_max_entries,
+            cache_max_age_days=args.cache_max_age_days,
+            tokens_per_minute=args.tpm,
+            max_retries=args.max_retries,
+            max_in_flight=max(16, args.workers),
+            checkpoint=True,
+            journal_file=args.journal_file,
+            resume=args.resume,
+            skip_translated=not args.overwrite,
+            backend=backend,
+            token_budget=args.token_budget,
+            max_output_tokens=args.max_output_tokens,
+            model_name=args.model,
+            system_instruction=args.system_instruction,
+            log_level=args.log_level,
+            row_log_sample=args.log_every,
+            progress_interval=args.progress_interval
+        )
+    except Exception as e:
+        print(f"Error initializing translator: {e}")
+        sys.exit(1)
+
+    # Process the file; closing the translator flushes the journal even if the run is interrupted
+    profiler = RunProfiler(translator, deep=args.profile == "full") if args.profile else None
+    try:
+        with profiler or contextlib.nullcontext():
+            result = translator.process_single_file(
+                input_file_path=args.input_file,
+                output_file_path=args.output_file,
+                delay=args.delay,
+                batch_size=args.batch_size,
+                concurrency=args.workers,
+                chunk_size=args.chunk_size
+            )
+        if console:
+            console.finish()
+
+        print("\n--- Translation Summary ---")
+        if result['success']:
+            print(f"✅ Success!")
+            print(f"   - Translations made: {result['translations_made']}")
+            print(f"   - Output file saved to: {result['output_file']}")
+            limiter_stats = translator.keys.stats()
+            print(f"   - Rate limit wait: {limiter_stats['waited_seconds']:.1f}s "
+                  f"over {limiter_stats['throttled_calls']} of {limiter_stats['calls']} calls")
+            if len(limiter_stats['keys']) > 1:
+                for key in limiter_stats['keys']:
+                    print(f"   - API key {key['key']}: {key['calls']} calls, {key['throttles']} throttled")
+            run_metrics = result['metrics']
+            if run_metrics['calls']:
+                latency = run_metrics['latency_seconds']
+                print(f"   - API calls: {run_metrics['calls']} ({run_metrics['retries']} retries), "
+                      f"latency p50 {latency['p50']:.2f}s / p95 {latency['p95']:.2f}s")
+                print(f"   - Tokens: {run_metrics['prompt_tokens']} prompt, {run_metrics['response_tokens']} response")
+            cache_stats = translator.cache_stats()
+            if cache_stats:
+                print(f"   - Translation memory hit rate: {cache_stats['hit_rate']:.1%} "
+                      f"({cache_stats['hits']} hits, {cache_stats['misses']} misses)")
+        else:
+            print(f"❌ Failure!")
+            print(f"   - Error: {result['error']}")
+        print("-------------------------")
+
+        if args.metrics_file:
+            translator.save_metrics(args.metrics_file)
+
+        if profiler:
+            print(profiler.save(args.profile_file, [result]))
+            print(f"🔬 Profile report saved to: {args.profile_file}")
+    finally:
+        if console:
+            console.finish()
+        translator.close()
+
+
+def plan(args):
+    """Print the dry-run plan for the input file or folder"""
+    try:
+        translator = ExcelTranslator(
+            api_key=parse_api_keys(args.api_key),
             prompt_file=args.prompt_file,
-            log_callback=print  # Log messages directly to the console
+            log_callback=print,
+            cache_file=args.cache_file,
+            tokens_per_minute=args.tpm,
+            max_in_flight=max(16, args.workers),
+            checkpoint=True,
+            journal_file=args.journal_file,
+            resume=args.resume,
+            skip_translated=not args.overwrite,
+            backend=SimulatedBackend() if args.backend == "simulated" else None,
+            token_budget=args.token_budget,
+            max_output_tokens=args.max_output_tokens,
+            model_name=args.model,
+            system_instruction=args.system_instruction,
+            log_level="warning"
         )
     except Exception as e:
         print(f"Error initializing translator: {e}")
         sys.exit(1)
 
-    # Process the file
-    result = translator.process_single_file(
-        input_file_path=args.input_file,
-        output_file_path=args.output_file,
-        delay=args.delay
-    )
-
-    print("\n--- Translation Summary ---")
-    if result['success']:
-        print(f"✅ Success!")
-        print(f"   - Translations made: {result['translations_made']}")
-        print(f"   - Output file saved to: {result['output_file']}")
-    else:
-        print(f"❌ Failure!")
-        print(f"   - Error: {result['error']}")
-    print("-------------------------")
+    try:
+        planner = RunPlanner(translator, request_latency=args.plan_latency)
+        print(planner.report(planner.plan(
+            [args.input_file],
+            batch_size=args.batch_size,
+            concurrency=args.workers,
+            delay=args.delay
+        )))
+    finally:
+        translator.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,157 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Iterable, Optional, Set
+
+
+def normalize_text(text: str) -> str:
+    """Normalize source text so trivially different copies share one memory entry"""
+    text = unicodedata.normalize('NFC', text)
+    return ' '.join(text.split())
+
+
+def context_hash(prompt_template: Optional[str], model_name: str) -> str:
+    """Hash the prompt template and model name that produced a translation"""
+    payload = f"{model_name}\x00{prompt_template or ''}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class TranslationMemory:
+    def __init__(self, db_path: str, context: str = '', max_entries: int = None,
+                 max_age_days: float = None, evict_every: int = 1000):
+        """
+        Open (or create) a disk-backed translation memory
+
+        Args:
+            db_path (str): Path to the SQLite database file
+            context (str): Hash of the prompt template and model name, see context_hash()
+            max_entries (int): Keep at most this many entries (least recently used are evicted)
+            max_age_days (float): Drop entries created more than this many days ago
+            evict_every (int): Apply the limits again after this many stores (never when 0), so they hold
+                during long runs too (they are also applied on open and close)
+        """
+        self.db_path = db_path
+        self.context = context
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.evict_every = evict_every
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        folder = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(folder, exist_ok=True)
+
+        # One connection shared by all worker threads, serialized by self.lock.
+        # WAL lets several processes read while one writes.
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS memory ("
+            "key TEXT PRIMARY KEY, "
+            "source TEXT NOT NULL, "
+            "translation TEXT NOT NULL, "
+            "created REAL NOT NULL, "
+            "last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS memory_last_used ON memory (last_used)")
+        self._conn.commit()
+
+        self.evict()
+
+    def _key(self, text: str) -> str:
+        payload = f"{self.context}\x00{normalize_text(text)}"
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, text: str) -> Optional[str]:
+        """Return the stored translation for text, or None on a miss"""
+        key = self._key(text)
+        with self.lock:
+            row = self._conn.execute("SELECT translation FROM memory WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._conn.execute("UPDATE memory SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def known(self, texts: Iterable[str]) -> Set[str]:
+        """Return the texts that have a stored translation, without counting hits or touching them"""
+        keys = {}
+        for text in texts:
+            keys.setdefault(self._key(text), []).append(text)
+
+        found = set()
+        key_list = list(keys)
+        with self.lock:
+            # Stay under SQLite's limit on query parameters
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key FROM memory WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for (key,) in rows:
+                    found.update(keys[key])
+        return found
+
+    def put(self, text: str, translation: str):
+        """Store a translation for text"""
+        key = self._key(text)
+        now = time.time()
+        with self.lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO memory (key, source, translation, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, normalize_text(text), translation, now, now)
+            )
+            self._conn.commit()
+            self._puts += 1
+            due = bool(self.evict_every) and self._puts % self.evict_every == 0
+
+        if due and (self.max_entries is not None or self.max_age_days is not None):
+            self.evict()
+
+    def evict(self) -> int:
+        """Apply the age and size limits, returning the number of entries removed"""
+        removed = 0
+        with self.lock:
+            if self.max_age_days is not None:
+                cutoff = time.time() - self.max_age_days * 86400
+                removed += self._conn.execute("DELETE FROM memory WHERE created < ?", (cutoff,)).rowcount
+
+            if self.max_entries is not None:
+                removed += self._conn.execute(
+                    "DELETE FROM memory WHERE key IN ("
+                    "SELECT key FROM memory ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                ).rowcount
+
+            self._conn.commit()
+        return removed
+
+    def stats(self) -> dict:
+        """Return entry count, hit/miss counters and hit rate for this session"""
+        with self.lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM memory").fetchone()[0]
+
+        lookups = self.hits + self.misses
+        return {
+            'entries': entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'db_path': self.db_path
+        }
+
+    def close(self):
+        """Apply the limits and close the underlying database connection"""
+        self.evict()
+        with self.lock:
+            self._conn.close()
@@ -0,0 +1,227 @@
+import json
+import os
+import threading
+from typing import Dict, Optional, Sequence
+
+# Outcome recorded for a call that returned a reply; failed calls record their error kind
+SUCCESS = 'success'
+
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000)
+RETRY_BUCKETS = (0, 1, 2, 3, 5, 10)
+
+
+class Histogram:
+    """Fixed-bucket histogram (Prometheus style), so memory stays constant however many calls are made"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot counts values above every bucket
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by interpolating inside the bucket that holds it"""
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, bound in enumerate(self.buckets):
+            if seen + self.counts[i] >= rank:
+                if not self.counts[i]:
+                    return bound
+                return lower + (bound - lower) * (rank - seen) / self.counts[i]
+            seen += self.counts[i]
+            lower = bound
+        return self.buckets[-1]
+
+    def to_dict(self) -> dict:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets['+Inf'] = self.count
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'buckets': buckets
+        }
+
+
+class _CallStats:
+    """Counters and histograms for one scope (the whole run or a single file)"""
+
+    def __init__(self):
+        self.calls = 0
+        self.outcomes: Dict[str, int] = {}
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self.backoff_seconds = 0.0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.prompt_token_hist = Histogram(TOKEN_BUCKETS)
+        self.response_token_hist = Histogram(TOKEN_BUCKETS)
+        self.retry_hist = Histogram(RETRY_BUCKETS)
+
+    def add(self, latency: float, prompt_tokens: int, response_tokens: int, retries: int, outcome: str):
+        self.calls += 1
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        self.retries += retries
+        self.prompt_tokens += prompt_tokens
+        self.response_tokens += response_tokens
+        self.latency.observe(latency)
+        self.prompt_token_hist.observe(prompt_tokens)
+        self.response_token_hist.observe(response_tokens)
+        self.retry_hist.observe(retries)
+
+    def to_dict(self) -> dict:
+        return {
+            'calls': self.calls,
+            'outcomes': dict(self.outcomes),
+            'retries': self.retries,
+            'prompt_tokens': self.prompt_tokens,
+            'response_tokens': self.response_tokens,
+            'backoff_seconds': self.backoff_seconds,
+            'latency_seconds': self.latency.to_dict(),
+            'prompt_tokens_per_call': self.prompt_token_hist.to_dict(),
+            'response_tokens_per_call': self.response_token_hist.to_dict(),
+            'retries_per_call': self.retry_hist.to_dict()
+        }
+
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class TranslationMetrics:
+    def __init__(self):
+        """
+        Per-call API metrics, aggregated for the whole run and for each input file
+
+        Every API request records its latency (time spent in the backend across all attempts,
+        excluding rate limit waits and backoff), prompt and response token counts as reported
+        by the backend, the number of retries and its outcome.
+        """
+        self.lock = threading.Lock()
+        self.run = _CallStats()
+        self.files: Dict[str, _CallStats] = {}
+
+    def _scopes(self, file_path: Optional[str]):
+        """The stats a record is added to: the run, plus the file's when file_path is given"""
+        if not file_path:
+            return [self.run]
+        key = os.path.abspath(file_path)
+        if key not in self.files:
+            self.files[key] = _CallStats()
+        return [self.run, self.files[key]]
+
+    def record_call(self, file_path: Optional[str], latency: float, prompt_tokens: int, response_tokens: int,
+                    retries: int, outcome: str):
+        """Record one API request; file_path is None for calls made outside a file"""
+        with self.lock:
+            for stats in self._scopes(file_path):
+                stats.add(latency, prompt_tokens, response_tokens, retries, outcome)
+
+    def record_backoff(self, file_path: Optional[str], seconds: float):
+        """Record time spent sleeping before retrying a failed request"""
+        with self.lock:
+            for stats in self._scopes(file_path):
+                stats.backoff_seconds += seconds
+
+    def snapshot(self, file_path: str = None) -> dict:
+        """Metrics of one file, or of the whole run plus every file when file_path is None"""
+        with self.lock:
+            if file_path is not None:
+                stats = self.files.get(os.path.abspath(file_path))
+                return (stats or _CallStats()).to_dict()
+
+            return {
+                'run': self.run.to_dict(),
+                'files': {path: stats.to_dict() for path, stats in self.files.items()}
+            }
+
+    def to_prometheus(self) -> str:
+        """Render the run metrics, plus per-file call and token counters, in Prometheus text format"""
+        with self.lock:
+            lines = [
+                '# HELP translator_api_calls_total API requests by outcome',
+                '# TYPE translator_api_calls_total counter'
+            ]
+            for outcome, count in sorted(self.run.outcomes.items()):
+                lines.append(f'translator_api_calls_total{{outcome="{outcome}"}} {count}')
+
+            lines += [
+                '# HELP translator_api_retries_total Retried attempts of API requests',
+                '# TYPE translator_api_retries_total counter',
+                f'translator_api_retries_total {self.run.retries}',
+                '# HELP translator_backoff_seconds_total Seconds slept before retrying failed requests',
+                '# TYPE translator_backoff_seconds_total counter',
+                f'translator_backoff_seconds_total {self.run.backoff_seconds}',
+                '# HELP translator_tokens_total Tokens reported by the backend',
+                '# TYPE translator_tokens_total counter',
+                f'translator_tokens_total{{direction="prompt"}} {self.run.prompt_tokens}',
+                f'translator_tokens_total{{direction="response"}} {self.run.response_tokens}'
+            ]
+
+            histograms = (
+                ('translator_api_latency_seconds', 'Time spent in the backend per API request',
+                 self.run.latency),
+                ('translator_prompt_tokens', 'Prompt tokens per API request', self.run.prompt_token_hist),
+                ('translator_response_tokens', 'Response tokens per API request', self.run.response_token_hist)
+            )
+            for name, help_text, histogram in histograms:
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for bound, count in histogram.to_dict()['buckets'].items():
+                    lines.append(f'{name}_bucket{{le="{bound}"}} {count}')
+                lines.append(f'{name}_sum {histogram.sum}')
+                lines.append(f'{name}_count {histogram.count}')
+
+            lines += [
+                '# HELP translator_file_api_calls_total API requests per input file',
+                '# TYPE translator_file_api_calls_total counter'
+            ]
+            for path, stats in sorted(self.files.items()):
+                lines.append(f'translator_file_api_calls_total{{file="{_label(path)}"}} {stats.calls}')
+
+            lines += [
+                '# HELP translator_file_tokens_total Tokens per input file',
+                '# TYPE translator_file_tokens_total counter'
+            ]
+            for path, stats in sorted(self.files.items()):
+                lines.append(f'translator_file_tokens_total{{file="{_label(path)}",direction="prompt"}} '
+                             f'{stats.prompt_tokens}')
+                lines.append(f'translator_file_tokens_total{{file="{_label(path)}",direction="response"}} '
+                             f'{stats.response_tokens}')
+
+        return '\n'.join(lines) + '\n'
+
+    def save(self, path: str, extra: dict = None):
+        """Write the metrics to path: Prometheus text for .prom/.txt files, JSON otherwise"""
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+
+        if path.endswith(('.prom', '.txt')):
+            content = self.to_prometheus()
+        else:
+            report = self.snapshot()
+            if extra:
+                report.update(extra)
+            content = json.dumps(report, indent=2, ensure_ascii=False)
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
@@ -1,34 +1,247 @@
-import pandas as pd
-import google.generativeai as genai
-import time
 import os
 import glob
-from typing import Optional, List
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+import asyncio
+import contextvars
+from typing import Optional, List, Union, TYPE_CHECKING
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import threading
+from translation_memory import TranslationMemory, context_hash, normalize_text
+from key_pool import KeyPool, PooledKey, parse_api_keys
+from async_engine import AsyncTranslationEngine
+from rate_limiter import RateLimiter, shared_rate_limiter
+from retry_policy import classify_error, backoff_delay, FATAL
+from checkpoint_journal import CheckpointJournal
+from xlsx_patch import patch_xlsx_column
+from file_processes import read_table, write_table, run_in, shared_process_pool, default_process_count
+from backends import TranslationBackend, GeminiBackend, BatchFormatError, measure_usage
+from translation_metrics import TranslationMetrics, SUCCESS
+from request_packer import RequestPacker, TokenEstimator
+from progress_events import EventEmitter, level_from_name, INFO, WARNING, ERROR, PROGRESS
+
+# pandas is imported where files are read, so the CLI and GUI start without paying for it
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Input file whose rows are being translated, so API call metrics can be attributed to it
+_current_file = contextvars.ContextVar('current_file', default=None)
+
+
+class _FileJob:
+    """Translation state of one input file"""
+
+    def __init__(self, input_file_path: str, output_file_path: str):
+        self.input_file_path = input_file_path
+        self.output_file_path = output_file_path
+        self.df = None
+        self.arabic_col = None
+        self.batches = []
+        self.remaining = 0
+        self.updates = {}  # row index -> translation, for patching the workbook in place
+        self.journal = None
+        self.failed_rows = 0
+        self.result = {
+            'file': input_file_path,
+            'success': False,
+            'translations_made': 0,
+            'total_rows': 0,
+            'error': None,
+            'output_file': None,
+            'phase_times': {'read': 0.0, 'translate': 0.0, 'write': 0.0}
+        }
+
+    def add_time(self, phase: str, started: float):
+        """Add the time since `started` (a perf_counter value) to a phase"""
+        self.result['phase_times'][phase] += time.perf_counter() - started
 
 
 class ExcelTranslator:
-    def __init__(self, api_key: str, prompt_file: str = None, log_callback=None, stop_flag_callback=None):
+    # Column indices
+    ENGLISH_COL_IDX = 2  # Third column
+    ARABIC_COL_IDX = 3  # Fourth column
+    CHECK_COL_IDX = 4  # Fifth column
+    INPUT_PATTERNS = ['*.xlsx', '*.xls', '*.csv']  # Files picked up in folder runs
+
+    def __init__(self, api_key: Union[str, List[str]], prompt_file: str = None, log_callback=None, stop_flag_callback=None,
+                 cache_file: str = None, cache_max_entries: int = None, cache_max_age_days: float = None,
+                 max_in_flight: int = 16, rate_limiter: RateLimiter = None, tokens_per_minute: float = None,
+                 max_retries: int = 5, retry_base_delay: float = 1.0,
+                 checkpoint: bool = False, journal_file: str = None, resume: bool = False,
+                 skip_translated: bool = True,
+                 backend: TranslationBackend = None, token_budget: int = None, max_output_tokens: int = 2048,
+                 model_name: str = 'gemini-pro', event_callback=None, log_level: str = 'info',
+                 row_log_sample: int = 1, progress_interval: float = 2.0, log_progress: bool = True,
+                 system_instruction: bool = False):
         """
         Initialize the translator with Gemini API key and optional custom prompt
 
         Args:
-            api_key (str): Your Google Gemini API key
+            api_key (str or list): Your Google Gemini API key, or several keys (a list or a comma
+                separated string) to spread requests across their quotas (unused when a backend is given)
             prompt_file (str): Path to text file containing custom translation prompt
             log_callback: Function to call for logging
             stop_flag_callback: Function to check if translation should stop
+            cache_file (str): Path to a translation memory database (disabled when None)
+            cache_max_entries (int): Maximum number of entries kept in the translation memory
+            cache_max_age_days (float): Maximum age of translation memory entries in days
+            max_in_flight (int): Maximum number of concurrent requests across all files
+            rate_limiter (RateLimiter): Limiter to use instead of the process-wide shared one (with
+                several API keys, each key always uses its own shared limiter)
+            tokens_per_minute (float): Token quota applied to the rate limiter of each key (Optional)
+            max_retries (int): Retries for throttled or transient API errors before a row fails
+            retry_base_delay (float): Base of the jittered exponential backoff in seconds
+            checkpoint (bool): Journal finished rows next to each output file
+                (<output>.journal.jsonl), so an interrupted run can be resumed
+            journal_file (str): One journal shared by every file instead (turns checkpoint on)
+            resume (bool): Replay the existing journal and only translate rows still missing
+            skip_translated (bool): Leave flagged rows alone when their Arabic cell is already filled
+            backend (TranslationBackend): Backend to translate with instead of Gemini (Optional)
+            token_budget (int): Pack rows into requests by estimated input tokens, up to this many
+                per request, instead of a fixed number of rows (Optional)
+            max_output_tokens (int): The model's output token limit each packed reply must stay under
+            model_name (str): Gemini model to use when no backend is given
+            event_callback: Function receiving every structured ProgressEvent (Optional)
+            log_level (str): Minimum event level: 'debug' (every row), 'info' (periodic progress),
+                'warning' or 'error'
+            row_log_sample (int): At debug level, emit one in every row_log_sample per-row events
+            progress_interval (float): Seconds between aggregated progress events
+            log_progress (bool): Also render progress events as log lines; turn off when
+                event_callback shows progress itself (a progress bar or a live console line)
+            system_instruction (bool): Send the prompt to Gemini as a system instruction instead of
+                in every message (gemini-1.5 and later; it is still billed on every request)
         """
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
-        self.custom_prompt = self._load_custom_prompt(prompt_file)
         self.lock = threading.Lock()
         self.log_callback = log_callback if log_callback else print
+
+        # log_callback receives the events rendered as log lines; event_callback the events themselves
+        if log_progress:
+            log_consumer = lambda event: self.log_callback(event.message)
+        else:
+            log_consumer = lambda event: event.kind == PROGRESS or self.log_callback(event.message)
+        self.events = EventEmitter(log_consumer, [event_callback] if event_callback else [],
+                                   level_from_name(log_level), row_log_sample, progress_interval)
         self.should_stop = stop_flag_callback if stop_flag_callback else lambda: False
+        self.skip_translated = skip_translated
+
+        self.custom_prompt = self._load_custom_prompt(prompt_file)
+
+        # Every worker thread and coroutine draws from the same rate limit bucket of each key
+        if backend:
+            keys = [PooledKey(None, backend, rate_limiter if rate_limiter else shared_rate_limiter())]
+        else:
+            api_keys = parse_api_keys(api_key) or [None]
+            if len(api_keys) == 1:
+                limiters = [rate_limiter if rate_limiter else shared_rate_limiter()]
+            else:
+                limiters = [shared_rate_limiter(key) for key in api_keys]
+            keys = [PooledKey(key, GeminiBackend(key, model_name, prompt_template=self.custom_prompt,
+                                                  system_instruction=system_instruction), limiter)
+                    for key, limiter in zip(api_keys, limiters)]
+        self.keys = KeyPool(keys)
+        if tokens_per_minute:
+            self.keys.configure(self.keys.requests_per_minute, tokens_per_minute)
+        if len(self.keys) > 1:
+            self.log(f"🔑 Spreading requests across {len(self.keys)} API keys")
+
+        # All keys share the model and prompt, so any backend serves for estimates and the memory key
+        self.backend = keys[0].backend
+        if getattr(self.backend, 'use_system_instruction', False):
+            self.log("📌 Sending the prompt as a system instruction")
+
+        self.memory = None
+        if cache_file:
+            self.memory = TranslationMemory(
+                cache_file,
+                context=context_hash(self.backend.signature(), self.backend.model_name),
+                max_entries=cache_max_entries,
+                max_age_days=cache_max_age_days
+            )
+            self.log(f"🧠 Using translation memory: {os.path.basename(cache_file)}")
+
+        # Journals are opened per output file as files are planned
+        self.checkpoint = checkpoint or bool(journal_file)
+        self.journal_file = journal_file
+        self.resume = resume
+        self._journals = {}
+
+        self.max_in_flight = max_in_flight
+        self._engine = None
 
-    def log(self, message):
-        """Log a message using the provided callback"""
-        self.log_callback(message)
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+
+        self._metrics = TranslationMetrics()
+
+        # One token estimate for packing, the tokens-per-minute limit and plans, calibrated on first use
+        self.estimator = TokenEstimator()
+        self.packer = None
+        if token_budget:
+            self.packer = RequestPacker(token_budget, max_output_tokens,
+                                        overhead_tokens=self.backend.estimate_request_tokens([], self.estimator),
+                                        estimator=self.estimator)
+        self._token_calibration_done = False
+
+    @property
+    def engine(self) -> AsyncTranslationEngine:
+        """Shared async engine, started on first use"""
+        with self.lock:
+            if self._engine is None:
+                self._engine = AsyncTranslationEngine(self.max_in_flight, controller=self.keys)
+            return self._engine
+
+    def close(self):
+        """Release the async engine, translation memory and journal"""
+        with self.lock:
+            if self._engine is not None:
+                self._engine.close()
+                self._engine = None
+        if self.memory:
+            self.memory.close()
+        with self.lock:
+            journals, self._journals = list(self._journals.values()), {}
+        for journal in journals:
+            journal.close()
+
+    def _journal_for(self, output_file_path: str) -> Optional[CheckpointJournal]:
+        """The checkpoint journal covering an output file, or None when checkpointing is off"""
+        if not self.checkpoint:
+            return None
+
+        path = self.journal_file or CheckpointJournal.default_path(output_file_path)
+        with self.lock:
+            journal = self._journals.get(path)
+            if journal is not None:
+                return journal
+            journal = self._journals[path] = CheckpointJournal(path, resume=self.resume)
+
+        if self.resume and journal.entries:
+            self.log(f"♻️ Resuming from journal: {os.path.basename(path)} ({len(journal.entries)} finished rows)")
+        elif not self.resume:
+            pending = journal.pending_rows()
+            if pending:
+                self.log(f"⚠️ {os.path.basename(path)} holds {pending} rows of an interrupted run; "
+                         f"resume to restore them instead of translating them again", WARNING)
+        return journal
+
+    def _finish_journal(self, job: '_FileJob'):
+        """Retire a saved file's journal entries once all of its rows are done, else just flush them"""
+        journal = job.journal
+        if journal is None:
+            return
+        if self.should_stop() or job.failed_rows:
+            journal.flush()  # Keep the rows for a resumed run
+            return
+
+        journal.complete(job.input_file_path)
+        if not self.journal_file:
+            # The output file's own journal has nothing left to resume
+            with self.lock:
+                self._journals.pop(journal.path, None)
+            journal.discard()
+
+    def log(self, message, level: int = INFO):
+        """Log a message through the event stream"""
+        self.events.message(message, level)
 
     def _load_custom_prompt(self, prompt_file: str) -> Optional[str]:
         """Load custom prompt from text file"""
@@ -42,179 +255,729 @@ class ExcelTranslator:
                     self.log(f"📄 Loaded custom prompt from: {os.path.basename(prompt_file)}")
                     return prompt
         except Exception as e:
-            self.log(f"❌ Error loading prompt file: {e}")
+            self.log(f"❌ Error loading prompt file: {e}", ERROR)
 
         return None
 
-    def translate_text(self, text: str, delay: float = 1.0) -> Optional[str]:
-        """Translate text from English to Arabic using Gemini API"""
+    def _split_cached(self, texts: List[str]):
+        """Fill in translation memory hits, returning the partial results and the indices still to send"""
+        results = [None] * len(texts)
+        pending = []
+        for i, text in enumerate(texts):
+            cached = self.memory.get(text) if self.memory else None
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append(i)
+        if len(pending) < len(texts):
+            self.events.rows_cached(_current_file.get(), len(texts) - len(pending))
+        return results, pending
+
+    @staticmethod
+    def _group_repeats(texts: List[str], pending: List[int]) -> List[List[int]]:
+        """Group pending indices by normalized text, so a text repeated within a batch is sent once"""
+        groups = {}
+        for i in pending:
+            groups.setdefault(normalize_text(texts[i]), []).append(i)
+        return list(groups.values())
+
+    def _remember(self, texts: List[str], translations: List[Optional[str]]):
+        """Store successful translations in the translation memory"""
+        if self.memory:
+            for text, translation in zip(texts, translations):
+                if translation:
+                    self.memory.put(text, translation)
+
+    def _on_retry(self, error: Exception, attempt: int) -> Optional[float]:
+        """Decide whether a failed call is retried, returning the backoff delay or None to give up"""
+        kind = classify_error(error)
+        if kind == FATAL or attempt >= self.max_retries or self.should_stop():
+            return None
+
+        wait = backoff_delay(attempt, base=self.retry_base_delay)
+        self._metrics.record_backoff(_current_file.get(), wait)
+        self.log(f"⏳ {kind.capitalize()} error ({type(error).__name__}), "
+                 f"retrying in {wait:.1f}s (attempt {attempt + 1}/{self.max_retries})", WARNING)
+        return wait
+
+    def _record_call(self, latency: float, usage: dict, retries: int, outcome: str):
+        """Add one finished API request to the metrics"""
+        self._metrics.record_call(_current_file.get(), latency, usage['prompt_tokens'],
+                                  usage['response_tokens'], retries, outcome)
+
+    def _release_key(self, key: PooledKey, outcome: str):
+        """Hand a key back to the pool, logging when it is taken out of rotation"""
+        cooldown = self.keys.release(key, outcome)
+        if cooldown:
+            self.log(f"🔑 API key {key.label} keeps hitting its quota, "
+                     f"taking it out of rotation for {cooldown:.0f}s", WARNING)
+
+    def _call(self, request, texts: List[str]):
+        """Run a backend request under its key's rate limit, retrying throttled and transient errors
+
+        request takes the backend of the API key picked for each attempt.
+        """
+        tokens = self.backend.estimate_request_tokens(texts, self.estimator)
+        attempt = 0
+        latency = 0.0
+        with measure_usage() as usage:
+            while True:
+                # Wait only if the rate limit bucket of every key is empty
+                key = self.keys.acquire(tokens)
+                started = time.perf_counter()
+                try:
+                    reply = request(key.backend)
+                except Exception as e:
+                    latency += time.perf_counter() - started
+                    self._release_key(key, classify_error(e))
+                    wait = self._on_retry(e, attempt)
+                    if wait is None:
+                        self._record_call(latency, usage, attempt, classify_error(e))
+                        raise
+                    time.sleep(wait)
+                    attempt += 1
+                    continue
+
+                latency += time.perf_counter() - started
+                self._release_key(key, SUCCESS)
+                self._record_call(latency, usage, attempt, SUCCESS)
+                return reply
+
+    async def _call_async(self, request, texts: List[str]):
+        """Async variant of _call; request returns a new awaitable for the given backend on every attempt"""
+        tokens = self.backend.estimate_request_tokens(texts, self.estimator)
+        attempt = 0
+        latency = 0.0
+        with measure_usage() as usage:
+            while True:
+                key = await self.keys.acquire_async(tokens)
+                started = time.perf_counter()
+                try:
+                    reply = await request(key.backend)
+                except Exception as e:
+                    latency += time.perf_counter() - started
+                    self._release_key(key, classify_error(e))
+                    wait = self._on_retry(e, attempt)
+                    if wait is None:
+                        self._record_call(latency, usage, attempt, classify_error(e))
+                        raise
+                    await asyncio.sleep(wait)
+                    attempt += 1
+                    continue
+
+                latency += time.perf_counter() - started
+                self._release_key(key, SUCCESS)
+                self._record_call(latency, usage, attempt, SUCCESS)
+                return reply
+
+    def translate_text(self, text: str, delay: float = None) -> Optional[str]:
+        """Translate text from English to Arabic using the configured backend
+
+        delay, when given, sets the shared rate limit to one request per `delay` seconds.
+        """
+        if delay is not None:
+            self.keys.set_delay(delay)
         if self.should_stop():
             return None
 
+        # Translation memory hits skip the API call and the rate limit delay
+        results, pending = self._split_cached([text])
+        if not pending:
+            return results[0]
+        return self._translate_batch_uncached([text])[0]
+
+    async def translate_text_async(self, text: str, delay: float = None) -> Optional[str]:
+        """Async variant of translate_text"""
+        if delay is not None:
+            self.keys.set_delay(delay)
+        if self.should_stop():
+            return None
+
+        results, pending = self._split_cached([text])
+        if not pending:
+            return results[0]
+        return (await self._translate_batch_uncached_async([text]))[0]
+
+    def translate_batch(self, texts: List[str], delay: float = None) -> List[Optional[str]]:
+        """Translate several texts with one API call per batch, returning results in input order"""
+        if delay is not None:
+            self.keys.set_delay(delay)
+        if self.should_stop():
+            return [None] * len(texts)
+
+        # Translation memory hits are filled in directly and never sent
+        results, pending = self._split_cached(texts)
+        if pending:
+            groups = self._group_repeats(texts, pending)
+            translations = self._translate_batch_uncached([texts[group[0]] for group in groups])
+            for group, translation in zip(groups, translations):
+                for i in group:
+                    results[i] = translation
+
+        return results
+
+    async def translate_batch_async(self, texts: List[str], delay: float = None) -> List[Optional[str]]:
+        """Async variant of translate_batch"""
+        if delay is not None:
+            self.keys.set_delay(delay)
+        if self.should_stop():
+            return [None] * len(texts)
+
+        results, pending = self._split_cached(texts)
+        if pending:
+            groups = self._group_repeats(texts, pending)
+            translations = await self._translate_batch_uncached_async([texts[group[0]] for group in groups])
+            for group, translation in zip(groups, translations):
+                for i in group:
+                    results[i] = translation
+
+        return results
+
+    def _translate_batch_uncached(self, texts: List[str]) -> List[Optional[str]]:
+        """Send texts missing from the memory in one request, halving the batch when the reply does not parse
+
+        A single text is sent as a plain single-row request; this is the one place that sends it.
+        """
+        if self.should_stop():
+            return [None] * len(texts)
+
+        if len(texts) == 1:
+            # The single-row request; callers have already looked the text up in the memory
+            text = texts[0]
+            try:
+                translation = self._call(lambda backend: backend.translate(text), [text])
+            except Exception as e:
+                self.log(f"❌ Error translating '{text[:30]}...': {str(e)}", ERROR)
+                return [None]
+            self._remember([text], [translation])
+            return [translation]
+
         try:
-            # Use custom prompt if available, otherwise use default
-            if self.custom_prompt:
-                prompt = self.custom_prompt.replace("{text}", text)
-            else:
-                prompt = f"Translate the following text from English to Arabic. Only provide the translation, no additional text:\n\n{text}"
+            translations = self._call(lambda backend: backend.translate_batch(texts), texts)
+        except BatchFormatError:
+            translations = None
+        except Exception as e:
+            self.log(f"❌ Error translating batch of {len(texts)} rows: {str(e)}", ERROR)
+            return [None] * len(texts)
+
+        if translations is None:
+            middle = len(texts) // 2
+            self.log(f"⚠️ Batch reply for {len(texts)} rows did not parse, "
+                     f"retrying as {middle} + {len(texts) - middle}", WARNING)
+            return (self._translate_batch_uncached(texts[:middle]) +
+                    self._translate_batch_uncached(texts[middle:]))
 
-            response = self.model.generate_content(prompt)
+        self._remember(texts, translations)
+        return translations
 
-            # Add delay to respect rate limits
-            time.sleep(delay)
+    async def _translate_batch_uncached_async(self, texts: List[str]) -> List[Optional[str]]:
+        """Async variant of _translate_batch_uncached"""
+        if self.should_stop():
+            return [None] * len(texts)
 
-            return response.text.strip()
+        if len(texts) == 1:
+            text = texts[0]
+            try:
+                translation = await self._call_async(lambda backend: backend.translate_async(text), [text])
+            except Exception as e:
+                self.log(f"❌ Error translating '{text[:30]}...': {str(e)}", ERROR)
+                return [None]
+            self._remember([text], [translation])
+            return [translation]
 
+        try:
+            translations = await self._call_async(lambda backend: backend.translate_batch_async(texts), texts)
+        except BatchFormatError:
+            translations = None
         except Exception as e:
-            self.log(f"❌ Error translating '{text[:30]}...': {str(e)}")
+            self.log(f"❌ Error translating batch of {len(texts)} rows: {str(e)}", ERROR)
+            return [None] * len(texts)
+
+        if translations is None:
+            middle = len(texts) // 2
+            self.log(f"⚠️ Batch reply for {len(texts)} rows did not parse, "
+                     f"retrying as {middle} + {len(texts) - middle}", WARNING)
+            first, second = await asyncio.gather(
+                self._translate_batch_uncached_async(texts[:middle]),
+                self._translate_batch_uncached_async(texts[middle:])
+            )
+            return first + second
+
+        self._remember(texts, translations)
+        return translations
+
+    def _translate_rows(self, batch: List[tuple]) -> List[Optional[str]]:
+        """Translate a batch of (row index, text) pairs"""
+        self.events.rows_started(batch)
+        if len(batch) == 1:
+            return [self.translate_text(batch[0][1])]
+        return self.translate_batch([text for _, text in batch])
+
+    async def _translate_rows_async(self, batch: List[tuple]) -> Optional[List[Optional[str]]]:
+        """Async variant of _translate_rows, returning None if a stop was requested before it started"""
+        if self.should_stop():
             return None
 
-    def process_single_file(self, input_file_path: str, output_file_path: str = None, delay: float = 1.0) -> dict:
-        """Process a single Excel file and translate specified cells"""
-        result = {
-            'file': input_file_path,
-            'success': False,
-            'translations_made': 0,
-            'total_rows': 0,
-            'error': None,
-            'output_file': None
-        }
+        self.events.rows_started(batch)
+        if len(batch) == 1:
+            return [await self.translate_text_async(batch[0][1])]
+        return await self.translate_batch_async([text for _, text in batch])
+
+    async def _translate_job_rows_async(self, job: '_FileJob', batch: List[tuple]) -> Optional[List[Optional[str]]]:
+        """_translate_rows_async with the API calls attributed to the job's file in the metrics"""
+        _current_file.set(job.input_file_path)
+        return await self._translate_rows_async(batch)
+
+    def cache_stats(self) -> Optional[dict]:
+        """Return translation memory statistics, or None when the memory is disabled"""
+        return self.memory.stats() if self.memory else None
+
+    def metrics(self) -> dict:
+        """Return the API call metrics of the run and of every file, with rate limit and memory stats"""
+        metrics = self._metrics.snapshot()
+        metrics['rate_limiter'] = self.keys.stats()
+        metrics['translation_memory'] = self.cache_stats()
+        return metrics
 
+    def save_metrics(self, path: str):
+        """Export the metrics to path, in Prometheus text format for .prom/.txt files and as JSON otherwise"""
+        self._metrics.save(path, extra={'rate_limiter': self.keys.stats(),
+                                        'translation_memory': self.cache_stats()})
+        self.log(f"📈 Metrics saved to: {os.path.basename(path)}")
+
+    @staticmethod
+    def _default_output_path(input_file_path: str) -> str:
+        name, ext = os.path.splitext(input_file_path)
+        return f"{name}_translated{ext}"
+
+    def _load_job(self, input_file_path: str, output_file_path: Optional[str], batch_size: int,
+                  pool: ProcessPoolExecutor = None) -> '_FileJob':
+        """Read a file and plan its translation batches; failures are recorded in the job result
+
+        With a process pool the file is parsed in a worker process, off this process's GIL.
+        """
+        job = _FileJob(input_file_path, output_file_path or self._default_output_path(input_file_path))
+        started = time.perf_counter()
         try:
             # Read the file
-            if input_file_path.endswith('.csv'):
-                df = pd.read_csv(input_file_path)
-            else:
-                df = pd.read_excel(input_file_path)
+            df = run_in(pool, read_table, input_file_path)
+            job.add_time('read', started)
 
-            result['total_rows'] = len(df)
+            job.result['total_rows'] = len(df)
             self.log(f"📂 Processing: {os.path.basename(input_file_path)} ({len(df)} rows)")
 
-            # Column indices
-            english_col_idx = 2  # Third column
-            arabic_col_idx = 3  # Fourth column
-            check_col_idx = 4  # Fifth column
+            self._plan_job(job, df, batch_size)
 
-            if len(df.columns) < 5:
-                result['error'] = "File must have at least 5 columns"
-                return result
+        except Exception as e:
+            job.result['error'] = str(e)
+            self.log(f"❌ Error processing {os.path.basename(input_file_path)}: {str(e)}", ERROR)
 
-            # Find rows to translate
-            rows_to_translate = df[df.iloc[:, check_col_idx] == 1]
-            self.log(f"🔍 Found {len(rows_to_translate)} rows marked for translation")
+        return job
 
-            # Translate each qualifying row
-            translations_made = 0
-            for idx, row in rows_to_translate.iterrows():
-                if self.should_stop():
-                    self.log("⏹️ Translation stopped by user")
-                    break
+    def _plan_job(self, job: '_FileJob', df: 'pd.DataFrame', batch_size: int):
+        """Find the rows of df to translate and group them into request batches"""
+        if len(df.columns) < 5:
+            job.result['error'] = "File must have at least 5 columns"
+            return
 
-                english_text = str(row.iloc[english_col_idx])
+        # Find rows to translate
+        indices, texts = self._select_rows(df)
+        pending = list(zip(indices.tolist(), texts.tolist()))
 
-                # Skip empty values
-                if pd.isna(english_text) or english_text.strip() == '' or english_text.lower() == 'nan':
-                    continue
+        # Translations are strings, so make sure the column can hold them
+        job.arabic_col = df.columns[self.ARABIC_COL_IDX]
+        df[job.arabic_col] = df[job.arabic_col].astype(object)
 
-                self.log(f"🔄 Translating row {idx}: '{english_text[:50]}...'")
+        # Rows finished by an earlier, interrupted run are restored from the journal
+        restored = 0
+        job.journal = self._journal_for(job.output_file_path)
+        if job.journal and job.journal.entries:
+            missing = []
+            for idx, english_text in pending:
+                arabic_translation = job.journal.lookup(job.input_file_path, idx, english_text)
+                if arabic_translation is None:
+                    missing.append((idx, english_text))
+                else:
+                    df.at[idx, job.arabic_col] = arabic_translation
+                    job.updates[idx] = arabic_translation
+                    job.result['translations_made'] += 1
 
-                arabic_translation = self.translate_text(english_text, delay)
+            restored = len(pending) - len(missing)
+            if restored:
+                self.log(f"♻️ Restored {restored} rows from the journal")
+            pending = missing
 
-                if arabic_translation:
-                    df.at[idx, df.columns[arabic_col_idx]] = arabic_translation
-                    translations_made += 1
-                    self.log(f"✅ Row {idx} translated successfully")
-                else:
-                    self.log(f"❌ Failed to translate row {idx}")
+        if self.packer or self.keys.tokens_per_minute:
+            self._calibrate_tokens(pending)
 
-            # Save the updated file
-            if output_file_path is None:
-                name, ext = os.path.splitext(input_file_path)
-                output_file_path = f"{name}_translated{ext}"
+        if self.packer:
+            # As many rows per request as the token budgets allow; batch_size > 1 still caps the rows
+            job.batches = self.packer.pack(pending, max_rows=batch_size if batch_size > 1 else None)
+        else:
+            # batch_size rows per request
+            batch_size = max(1, batch_size)
+            job.batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+        job.remaining = len(job.batches)
+        job.df = df
+        self.events.rows_planned(job.input_file_path, len(pending), restored)
+
+    def _calibrate_tokens(self, pending: List[tuple], sample_rows: int = 50):
+        """Calibrate the token estimate once, with one API token count of sample rows
+
+        The count is an API request like any other, so it goes through the key pool, the rate
+        limit and the retry policy.
+        """
+        estimator = self.estimator
+        with self.lock:
+            # Attempted once per translator, even when counting fails, so files don't each retry it
+            if self._token_calibration_done or not pending:
+                return
+            self._token_calibration_done = True
+        if type(self.backend).count_tokens is TranslationBackend.count_tokens:
+            return  # Nothing to calibrate against, keep the default estimate
 
-            if output_file_path.endswith('.csv'):
-                df.to_csv(output_file_path, index=False)
+        sample = "\n".join(text for _, text in pending[:sample_rows])
+        try:
+            estimator.calibrate(sample, self._call(lambda backend: backend.count_tokens(sample), [sample]))
+        except Exception as e:
+            self.log(f"⚠️ Could not count tokens, using the default estimate: {str(e)}", WARNING)
+            return
+
+        if self.packer:
+            self.packer.overhead_tokens = self.backend.estimate_request_tokens([], estimator)
+
+        self.log(f"📏 Token estimate calibrated: {estimator.chars_per_token:.2f} characters per token")
+
+    def _select_rows(self, df: 'pd.DataFrame'):
+        """Return the row indices and source texts of flagged rows that still need translating
+
+        The selection is vectorized: flagged in the check column, a non-blank source text, and
+        (unless skip_translated is off) an empty Arabic cell.
+        """
+        flagged = df.iloc[:, self.CHECK_COL_IDX] == 1
+        self.log(f"🔍 Found {int(flagged.sum())} rows marked for translation")
+
+        english = df.iloc[:, self.ENGLISH_COL_IDX][flagged]
+        english_text = english.astype(str).str.strip()
+        has_text = english.notna() & (english_text != '') & (english_text.str.lower() != 'nan')
+        mask = has_text
+
+        if self.skip_translated:
+            arabic = df.iloc[:, self.ARABIC_COL_IDX][flagged]
+            translated = arabic.notna() & (arabic.astype(str).str.strip() != '')
+            skipped = int((has_text & translated).sum())
+            if skipped:
+                self.log(f"⏭️ Skipping {skipped} rows that already have a translation")
+            mask = has_text & ~translated
+
+        return english.index[mask].to_numpy(), english[mask].astype(str).to_numpy()
+
+    def _translate_job(self, job: '_FileJob', concurrency: int):
+        """Translate every planned batch of a job, honoring stop requests"""
+        started = time.perf_counter()
+        try:
+            self._run_job_batches(job, concurrency)
+        finally:
+            job.add_time('translate', started)
+
+    def _run_job_batches(self, job: '_FileJob', concurrency: int):
+        if concurrency > 1 and len(job.batches) > 1:
+            # Keep up to `concurrency` requests in flight on the shared event loop; results
+            # arrive out of order but are written back by row index
+            self.log(f"⚡ Translating with up to {concurrency} concurrent requests")
+            self.engine.run(self.engine.map(
+                lambda batch: self._translate_job_rows_async(job, batch),
+                job.batches,
+                concurrency,
+                on_done=lambda _, batch, arabic_translations: self._record(job, batch, arabic_translations)
+            ))
+            if self.should_stop():
+                self.log("⏹️ Translation stopped by user")
+        else:
+            current = _current_file.set(job.input_file_path)
+            try:
+                for batch in job.batches:
+                    if self.should_stop():
+                        self.log("⏹️ Translation stopped by user")
+                        break
+
+                    self._record(job, batch, self._translate_rows(batch))
+            finally:
+                _current_file.reset(current)
+
+    def _record(self, job: '_FileJob', batch: List[tuple], arabic_translations: Optional[List[Optional[str]]]):
+        """Write a finished batch back into the job's DataFrame by row index"""
+        if arabic_translations is None:
+            return  # Skipped because of a stop request
+
+        for (idx, english_text), arabic_translation in zip(batch, arabic_translations):
+            if arabic_translation:
+                job.df.at[idx, job.arabic_col] = arabic_translation
+                job.updates[idx] = arabic_translation
+                job.result['translations_made'] += 1
+                if job.journal:
+                    job.journal.record(job.input_file_path, idx, english_text, arabic_translation)
             else:
-                df.to_excel(output_file_path, index=False)
+                job.failed_rows += 1
+            self.events.row_finished(job.input_file_path, idx, bool(arabic_translation))
+
+    def _save_job(self, job: '_FileJob', pool: ProcessPoolExecutor = None) -> dict:
+        """Save the job's DataFrame to its output file and return the final result
+
+        With a process pool the workbook is patched or serialized in a worker process.
+        """
+        result = job.result
+        started = time.perf_counter()
+        try:
+            if job.output_file_path.endswith('.csv') or not self._patch_workbook(job, pool):
+                run_in(pool, write_table, job.df, job.output_file_path)
+            job.add_time('write', started)
 
             result['success'] = True
-            result['translations_made'] = translations_made
-            result['output_file'] = output_file_path
+            result['output_file'] = job.output_file_path
 
-            self.log(f"💾 Saved: {os.path.basename(output_file_path)} ({translations_made} translations)")
+            self._finish_journal(job)
+
+            self.events.progress(force=True)
+            self.log(f"💾 Saved: {os.path.basename(job.output_file_path)} ({result['translations_made']} translations)")
 
         except Exception as e:
             result['error'] = str(e)
-            self.log(f"❌ Error processing {os.path.basename(input_file_path)}: {str(e)}")
+            self.log(f"❌ Error processing {os.path.basename(job.input_file_path)}: {str(e)}", ERROR)
 
-        return result
+        return self._final_result(job)
 
-    def batch_process_folder(self, folder_path: str, output_folder: str = None,
-                             max_workers: int = 3, delay: float = 1.0,
-                             file_extensions: List[str] = None) -> List[dict]:
-        """Process all Excel/CSV files in a folder with parallel processing"""
-        if file_extensions is None:
-            file_extensions = ['*.xlsx', '*.xls', '*.csv']
+    def _final_result(self, job: '_FileJob') -> dict:
+        """The job's result with its API call metrics, for every way a file can finish"""
+        job.result['metrics'] = self._metrics.snapshot(job.input_file_path)
+        return job.result
+
+    def _patch_workbook(self, job: '_FileJob', pool: ProcessPoolExecutor = None) -> bool:
+        """Update only the translated cells of the original .xlsx, keeping formatting and other sheets
+
+        Returns False when the workbook can't be patched, so the caller rewrites it with to_excel.
+        """
+        import pandas as pd
+
+        if not (job.input_file_path.endswith('.xlsx') and job.output_file_path.endswith('.xlsx')):
+            return False
+        if not job.df.index.equals(pd.RangeIndex(len(job.df))):
+            return False
+
+        try:
+            return run_in(pool, patch_xlsx_column, job.input_file_path, job.output_file_path,
+                          self.ARABIC_COL_IDX, job.updates, len(job.df))
+        except Exception as e:
+            self.log(f"⚠️ Could not patch {os.path.basename(job.input_file_path)} in place, "
+                     f"rewriting it: {str(e)}", WARNING)
+            return False
+
+    def process_single_file(self, input_file_path: str, output_file_path: str = None, delay: float = 1.0,
+                            batch_size: int = 1, concurrency: int = 1, chunk_size: int = None) -> dict:
+        """Process a single Excel file and translate specified cells
+
+        With batch_size > 1, up to batch_size flagged rows are sent in a single API request.
+        With concurrency > 1, up to that many requests for this file are kept in flight on
+        the async engine (bounded overall by max_in_flight). delay sets the shared rate limit
+        to one request per `delay` seconds across all workers. With chunk_size, CSV to CSV
+        runs are streamed chunk by chunk (see process_csv_streaming).
+        """
+        if chunk_size and self._can_stream(input_file_path, output_file_path):
+            return self.process_csv_streaming(input_file_path, output_file_path, delay,
+                                              batch_size, concurrency, chunk_size)
+
+        self.keys.set_delay(delay)
+
+        job = self._load_job(input_file_path, output_file_path, batch_size)
+        if job.df is None:
+            return self._final_result(job)
 
-        # Find all matching files
+        try:
+            self._translate_job(job, concurrency)
+        except Exception as e:
+            job.result['error'] = str(e)
+            self.log(f"❌ Error processing {os.path.basename(input_file_path)}: {str(e)}", ERROR)
+            return self._final_result(job)
+
+        return self._save_job(job)
+
+    @staticmethod
+    def _can_stream(input_file_path: str, output_file_path: Optional[str]) -> bool:
+        return input_file_path.endswith('.csv') and (output_file_path is None or output_file_path.endswith('.csv'))
+
+    def process_csv_streaming(self, input_file_path: str, output_file_path: str = None, delay: float = 1.0,
+                              batch_size: int = 1, concurrency: int = 1, chunk_size: int = 10000) -> dict:
+        """Translate a CSV file chunk by chunk, appending each finished chunk to the output
+
+        Memory stays bounded by chunk_size and the requests in flight, and output starts
+        appearing before the whole input has been read.
+        """
+        import pandas as pd
+
+        self.keys.set_delay(delay)
+
+        output_file_path = output_file_path or self._default_output_path(input_file_path)
+        stream = _FileJob(input_file_path, output_file_path)
+        result = stream.result
+        self.log(f"📂 Streaming: {os.path.basename(input_file_path)} ({chunk_size} rows per chunk)")
+
+        try:
+            reader = pd.read_csv(input_file_path, chunksize=chunk_size)
+            number = 0
+            while True:
+                started = time.perf_counter()
+                chunk = next(reader, None)
+                stream.add_time('read', started)
+                if chunk is None:
+                    break
+
+                job = _FileJob(input_file_path, output_file_path)
+                self._plan_job(job, chunk, batch_size)
+                if job.df is None:
+                    result['error'] = job.result['error']
+                    return self._final_result(stream)
+
+                # After a stop request the remaining chunks are copied through untranslated
+                if not self.should_stop():
+                    self._translate_job(job, concurrency)
+                    result['phase_times']['translate'] += job.result['phase_times']['translate']
+
+                started = time.perf_counter()
+                chunk.to_csv(output_file_path, mode='w' if number == 0 else 'a', header=number == 0, index=False)
+                stream.add_time('write', started)
+
+                result['total_rows'] += len(chunk)
+                result['translations_made'] += job.result['translations_made']
+                stream.journal = job.journal
+                stream.failed_rows += job.failed_rows
+                number += 1
+                self.log(f"💾 Chunk {number} written ({result['total_rows']} rows so far)")
+
+            result['success'] = True
+            result['output_file'] = output_file_path
+            self._finish_journal(stream)
+
+            self.events.progress(force=True)
+            self.log(f"💾 Saved: {os.path.basename(output_file_path)} ({result['translations_made']} translations)")
+
+        except Exception as e:
+            result['error'] = str(e)
+            self.log(f"❌ Error processing {os.path.basename(input_file_path)}: {str(e)}", ERROR)
+
+        return self._final_result(stream)
+
+    @staticmethod
+    def find_input_files(folder_path: str, file_extensions: List[str] = None) -> List[str]:
+        """Return the Excel/CSV files in a folder matching file_extensions (glob patterns)"""
         all_files = []
-        for ext in file_extensions:
+        for ext in file_extensions or ExcelTranslator.INPUT_PATTERNS:
             pattern = os.path.join(folder_path, ext)
             all_files.extend(glob.glob(pattern))
+        return all_files
+
+    def batch_process_folder(self, folder_path: str, output_folder: str = None,
+                             max_workers: int = 3, delay: float = 1.0,
+                             file_extensions: List[str] = None, batch_size: int = 1,
+                             concurrency: int = 1, chunk_size: int = None,
+                             processes: int = 0) -> List[dict]:
+        """Process all Excel/CSV files in a folder with parallel processing
+
+        Flagged rows from every file go into one shared work queue that a fixed pool of
+        max_workers * concurrency workers drains, so one large file does not leave workers
+        idle. Each file is written out as soon as all of its rows are done. With chunk_size,
+        CSV files are instead streamed one after another once the shared queue is done.
 
+        Parsing and writing workbooks is CPU-bound and holds the GIL, so with processes > 1
+        (or None for one per CPU core) and more than one file it runs in a pool of worker
+        processes instead of threads. API calls stay on the async engine in this process.
+        Starting the workers costs a pandas import each, so this only pays off for folders of
+        large workbooks. The workers are spawned, which re-imports the calling script in each
+        of them: a script that opts in must start its run under `if __name__ == "__main__":`.
+        In the GUI this is the "Read/write files in" setting of batch processing.
+        """
+        all_files = self.find_input_files(folder_path, file_extensions)
         if not all_files:
-            self.log(f"❌ No files found in {folder_path} with extensions {file_extensions}")
+            self.log(f"❌ No files found in {folder_path} with extensions "
+                     f"{file_extensions or self.INPUT_PATTERNS}", ERROR)
             return []
 
+        self.keys.set_delay(delay)
+
+        pool_size = max(1, max_workers) * max(1, concurrency)
         self.log(f"📁 Found {len(all_files)} files to process")
-        self.log(f"⚡ Using {max_workers} parallel workers")
+        self.log(f"⚡ Using {pool_size} parallel workers")
 
         # Set up output folder
         if output_folder is None:
             output_folder = folder_path
         os.makedirs(output_folder, exist_ok=True)
 
-        # Process files in parallel
-        results = []
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all tasks
-            future_to_file = {}
-            for file_path in all_files:
-                if self.should_stop():
-                    break
+        output_paths = {}
+        for file_path in all_files:
+            name, ext = os.path.splitext(os.path.basename(file_path))
+            output_paths[file_path] = os.path.join(output_folder, f"{name}_translated{ext}")
 
-                # Create output path
-                filename = os.path.basename(file_path)
-                name, ext = os.path.splitext(filename)
-                output_path = os.path.join(output_folder, f"{name}_translated{ext}")
-
-                # Submit task
-                future = executor.submit(
-                    self.process_single_file,
-                    file_path,
-                    output_path,
-                    delay
-                )
-                future_to_file[future] = file_path
-
-            # Collect results as they complete
-            for future in as_completed(future_to_file):
-                if self.should_stop():
-                    break
+        streamed_files = [path for path in all_files if chunk_size and self._can_stream(path, None)]
+        loaded_files = [path for path in all_files if path not in streamed_files]
 
-                file_path = future_to_file[future]
-                try:
-                    result = future.result()
-                    results.append(result)
-                except Exception as e:
-                    results.append({
-                        'file': file_path,
-                        'success': False,
-                        'error': f"Processing failed: {str(e)}",
-                        'translations_made': 0,
-                        'total_rows': 0,
-                        'output_file': None
-                    })
+        # Threads only wait on the worker processes, one per process in use
+        processes = default_process_count() if processes is None else processes
+        file_pool = None
+        io_threads = max_workers
+        if processes > 1 and len(loaded_files) > 1:
+            file_pool = shared_process_pool(processes)
+            io_threads = min(processes, len(loaded_files))
+            self.log(f"🧮 Reading and writing files in {io_threads} worker processes")
+
+        # Read all other files in parallel
+        with ThreadPoolExecutor(max_workers=io_threads) as executor:
+            futures = [executor.submit(self._load_job, file_path, output_paths[file_path], batch_size, file_pool)
+                       for file_path in loaded_files]
+            jobs = [future.result() for future in futures]
+
+        results = [self._final_result(job) for job in jobs if job.df is None]
+
+        # Smallest files first, so their outputs appear early
+        jobs = sorted((job for job in jobs if job.df is not None), key=lambda job: len(job.batches))
+        work = [(job, batch) for job in jobs for batch in job.batches]
+
+        with ThreadPoolExecutor(max_workers=io_threads) as writer:
+            save_futures = [writer.submit(self._save_job, job, file_pool) for job in jobs if job.remaining == 0]
+            translate_started = time.perf_counter()
+
+            def on_done(_, item, arabic_translations):
+                job, batch = item
+                self._record(job, batch, arabic_translations)
+                job.remaining -= 1
+                if job.remaining == 0:
+                    # Time from the start of the shared queue until this file's last row finished
+                    job.add_time('translate', translate_started)
+                    save_futures.append(writer.submit(self._save_job, job, file_pool))
+
+            try:
+                self.engine.run(self.engine.map(
+                    lambda item: self._translate_job_rows_async(*item),
+                    work,
+                    pool_size,
+                    on_done=on_done
+                ))
+            except Exception as e:
+                self.log(f"❌ Batch translation failed: {str(e)}", ERROR)
+
+            if self.should_stop():
+                self.log("⏹️ Translation stopped by user")
+
+            for job in jobs:
+                if job.remaining > 0:
+                    job.result['error'] = "Processing failed: translation did not finish"
+                    results.append(self._final_result(job))
+
+            for future in save_futures:
+                results.append(future.result())
+
+        for file_path in streamed_files:
+            results.append(self.process_csv_streaming(file_path, output_paths[file_path], delay,
+                                                      batch_size, pool_size, chunk_size))
 
         # Print summary
         self._print_batch_summary(results)
@@ -234,6 +997,25 @@ class ExcelTranslator:
         self.log(f"Failed files: {total_files - successful_files}")
         self.log(f"Total translations made: {total_translations}")
 
+        limiter_stats = self.keys.stats()
+        self.log(f"Rate limit wait: {limiter_stats['waited_seconds']:.1f}s "
+                 f"over {limiter_stats['throttled_calls']} of {limiter_stats['calls']} calls")
+        if len(limiter_stats['keys']) > 1:
+            for key in limiter_stats['keys']:
+                self.log(f"  - API key {key['key']}: {key['calls']} calls, {key['throttles']} throttled")
+
+        run = self._metrics.snapshot()['run']
+        if run['calls']:
+            latency = run['latency_seconds']
+            self.log(f"API calls: {run['calls']} ({run['retries']} retries), "
+                     f"latency p50 {latency['p50']:.2f}s / p95 {latency['p95']:.2f}s, "
+                     f"tokens {run['prompt_tokens']} in / {run['response_tokens']} out")
+
+        if self.memory:
+            stats = self.memory.stats()
+            self.log(f"Translation memory hit rate: {stats['hit_rate']:.1%} "
+                     f"({stats['hits']} hits, {stats['misses']} misses)")
+
         if successful_files < total_files:
             self.log("\n❌ Failed files:")
             for result in results:
@@ -0,0 +1,157 @@
+import os
+import posixpath
+import re
+import tempfile
+import zipfile
+from typing import Dict, Optional
+from xml.sax.saxutils import escape
+
+_ROW_RE = re.compile(r'<row\b([^>]*?)(/>|>(.*?)</row>)', re.DOTALL)
+_ROW_NUMBER_RE = re.compile(r'\br="(\d+)"')
+_CELL_RE = re.compile(r'<c\b([^>]*?)(/>|>(.*?)</c>)', re.DOTALL)
+_CELL_REF_RE = re.compile(r'\br="([A-Z]+)(\d+)"')
+_STYLE_RE = re.compile(r'\bs="(\d+)"')
+_VALUE_RE = re.compile(r'<v>|<is>|<v\s')
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def column_letter(index: int) -> str:
+    """Convert a zero-based column index to an Excel column letter (0 -> A)"""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def _column_number(letters: str) -> int:
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord('A') + 1
+    return number
+
+
+def _first_sheet_path(archive: zipfile.ZipFile) -> Optional[str]:
+    """Path inside the archive of the first worksheet, the one pd.read_excel reads by default"""
+    workbook = archive.read('xl/workbook.xml').decode('utf-8')
+    sheet = re.search(r'<sheet\b[^>]*?\br:id="([^"]+)"', workbook)
+    if not sheet:
+        return None
+
+    rels = archive.read('xl/_rels/workbook.xml.rels').decode('utf-8')
+    for rel in re.finditer(r'<Relationship\b[^>]*>', rels):
+        if f'Id="{sheet.group(1)}"' in rel.group(0):
+            target = re.search(r'Target="([^"]+)"', rel.group(0)).group(1)
+            if target.startswith('/'):
+                return target.lstrip('/')
+            return posixpath.normpath(posixpath.join('xl', target))
+    return None
+
+
+def _inline_cell(ref: str, attributes: str, text: str) -> str:
+    style = _STYLE_RE.search(attributes)
+    style_attr = f' s="{style.group(1)}"' if style else ''
+    text = escape(_INVALID_XML_CHARS.sub('', text))
+    return f'<c r="{ref}"{style_attr} t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _patch_row(row_number: int, attributes: str, body: str, column: str, text: str) -> Optional[str]:
+    """Return the row XML with one cell replaced or inserted, or None if the row can't be patched safely"""
+    ref = f'{column}{row_number}'
+    target = _column_number(column)
+    cells = list(_CELL_RE.finditer(body))
+
+    for cell in cells:
+        cell_ref = _CELL_REF_RE.search(cell.group(1))
+        if not cell_ref:
+            return None  # Cells without explicit references can't be located reliably
+
+        number = _column_number(cell_ref.group(1))
+        if number == target:
+            if cell.group(3) and '<f' in cell.group(3):
+                return None  # Don't overwrite formulas (calcChain would go stale)
+            new_cell = _inline_cell(ref, cell.group(1), text)
+            body = body[:cell.start()] + new_cell + body[cell.end():]
+            return f'<row{attributes}>{body}</row>'
+        if number > target:
+            new_cell = _inline_cell(ref, '', text)
+            body = body[:cell.start()] + new_cell + body[cell.start():]
+            return f'<row{attributes}>{body}</row>'
+
+    return f'<row{attributes}>{body}{_inline_cell(ref, "", text)}</row>'
+
+
+def patch_xlsx_column(source_path: str, output_path: str, column_index: int, values: Dict[int, str],
+                      data_rows: int) -> bool:
+    """
+    Write `values` into one column of the first worksheet without rewriting the rest of the workbook
+
+    values maps zero-based DataFrame row positions (as read by pd.read_excel with a header row)
+    to cell text. Only the worksheet XML of the first sheet is edited, and only the target cells
+    within it; every other part of the package (styles, other sheets, validations, drawings) is
+    copied through unchanged. Returns False without writing anything when the sheet layout can't
+    be mapped to DataFrame rows safely, so the caller can fall back to a full rewrite.
+
+    Args:
+        source_path (str): The original .xlsx workbook
+        output_path (str): Where to save the patched workbook (may equal source_path)
+        column_index (int): Zero-based column to update
+        values (dict): DataFrame row position -> new cell text
+        data_rows (int): Number of data rows pd.read_excel returned, used to verify the row mapping
+    """
+    with zipfile.ZipFile(source_path) as source:
+        sheet_path = _first_sheet_path(source)
+        if sheet_path is None or sheet_path not in source.namelist():
+            return False
+
+        sheet = source.read(sheet_path).decode('utf-8')
+        rows = list(_ROW_RE.finditer(sheet))
+        if not rows:
+            return False
+
+        # pd.read_excel drops blank rows, so the mapping (position p -> row p + 2) only holds when
+        # the rows holding values are exactly the header plus data_rows consecutive rows
+        numbered = {}
+        value_rows = []
+        for row in rows:
+            number = _ROW_NUMBER_RE.search(row.group(1))
+            if not number:
+                return False
+            number = int(number.group(1))
+            numbered[number] = row
+            if row.group(3) and _VALUE_RE.search(row.group(3)):
+                value_rows.append(number)
+        if value_rows != list(range(1, data_rows + 2)):
+            return False
+
+        column = column_letter(column_index)
+        pieces = []
+        last = 0
+        for position in sorted(values):
+            row_number = position + 2
+            row = numbered[row_number]
+            patched = _patch_row(row_number, row.group(1), row.group(3) or '', column, values[position])
+            if patched is None:
+                return False
+            pieces.append(sheet[last:row.start()])
+            pieces.append(patched)
+            last = row.end()
+        pieces.append(sheet[last:])
+        patched_sheet = ''.join(pieces).encode('utf-8')
+
+        # Write next to the destination first so output_path may equal source_path
+        folder = os.path.dirname(os.path.abspath(output_path))
+        handle, temp_path = tempfile.mkstemp(suffix='.xlsx', dir=folder)
+        os.close(handle)
+        try:
+            with zipfile.ZipFile(temp_path, 'w') as target:
+                for info in source.infolist():
+                    data = patched_sheet if info.filename == sheet_path else source.read(info)
+                    target.writestr(info, data, compress_type=info.compress_type)
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+    os.replace(temp_path, output_path)
+    return True